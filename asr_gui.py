@@ -1,13 +1,17 @@
+import hashlib
 import logging
-import math
 import os
+import tempfile
+import threading
 import uuid
 
 from pathlib import Path
 import platform
+import sqlite3
 import subprocess
 import sys
 import webbrowser
+from concurrent.futures import Future
 
 from PIL import Image, ImageFilter
 
@@ -15,7 +19,7 @@ from PIL import Image, ImageFilter
 plugin_path = os.path.join(sys.prefix, 'Lib', 'site-packages', 'PyQt5', 'Qt5', 'plugins')
 os.environ['QT_QPA_PLATFORM_PLUGIN_PATH'] = plugin_path
 
-from PyQt5.QtCore import Qt, QRunnable, QThreadPool, QObject, pyqtSignal as Signal, pyqtSlot as Slot, QSize, QThread, \
+from PyQt5.QtCore import Qt, QObject, pyqtSignal as Signal, QSize, QThread, \
     pyqtSignal
 from PyQt5.QtGui import QCursor, QColor, QFont
 from PyQt5.QtWidgets import (QApplication, QWidget, QVBoxLayout, QHBoxLayout, QFileDialog,
@@ -24,9 +28,16 @@ from qfluentwidgets import (ComboBox, PushButton, LineEdit, TableWidget, FluentI
                             Action, RoundMenu, InfoBar, InfoBarPosition,
                             FluentWindow, BodyLabel, MessageBox, SpinBox)
 
-from bk_asr.BcutASR import BcutASR
+from bk_asr.BcutASR import BcutASR, PART_CONCURRENCY
+from bk_asr.HttpClient import ensure_pool_size
 from bk_asr.JianYingASR import JianYingASR
 from bk_asr.KuaiShouASR import KuaiShouASR
+from bk_asr.Pipeline import Pipeline
+from bk_asr.BaseASR import BaseASR
+from bk_asr.ASRData import ASRData, EXPORT_FORMATS
+from bk_asr.AudioUtils import UPLOAD_PROFILES, DEFAULT_UPLOAD_PROFILE, transcode_to_memory, \
+    remux_to_memory, probe_format, decode_mode, upload_profile_args
+from bk_asr.VAD import trim_silence
 
 # 设置日志配置
 logging.basicConfig(
@@ -39,7 +50,7 @@ class WorkerSignals(QObject):
     finished = Signal(str, str)
     errno = Signal(str, str)
 
-def img_resize(img_path:str,tar_width:int,tar_height:int,radius:int=15,padding:float=0.1):
+def img_resize(img_path:str,tar_width:int,tar_height:int,radius:int=15,padding:float=0.1,output:str=None):
     with Image.open(img_path) as image:
         if image.width/image.height<=tar_width/tar_height:
             back_size = (tar_width, int(tar_width * image.height / image.width))
@@ -62,89 +73,203 @@ def img_resize(img_path:str,tar_width:int,tar_height:int,radius:int=15,padding:f
         fill_y = int((tar_height - fore_image.height) / 2)
         back_image.paste(fore_image, ( fill_x,fill_y), fore_image)
 
-        resize_file = img_path.rsplit(".", 1)[0] + '_resize_rad_' + str(radius)+"_"+str(uuid.uuid4())[:8] + ".png"
-        back_image.save(resize_file)
+        resize_file = output or img_path.rsplit(".", 1)[0] + '_resize_rad_' + str(radius)+"_"+str(uuid.uuid4())[:8] + ".png"
+        back_image.save(resize_file, format="PNG")
         return resize_file
 
-class ASRWorker(QRunnable):
-    """ASR处理工作线程"""
-    def __init__(self, file_path, asr_engine, export_format,ui_self):
-        super().__init__()
+
+# 预渲染背景的缓存目录，同一封面、分辨率、留白和帧率只渲染一次
+RENDER_CACHE_DIR = os.path.join(tempfile.gettempdir(), "bk_asr", "render")
+# 预编码的静态画面循环片段时长（秒），合成时循环复用，不再逐帧编码
+RENDER_LOOP_SECONDS = 10
+_render_locks = {}
+_render_locks_lock = threading.Lock()
+
+
+def cached_background(img_path: str, scale: str, padding: float, rate: int, resize: bool = True) -> str:
+    """返回静态画面循环片段的路径，按 (图片哈希, 分辨率, 留白, 帧率) 缓存；resize 为 False 时直接缩放原图"""
+    with open(img_path, "rb") as f:
+        img_hash = hashlib.sha1(f.read()).hexdigest()[:16]
+    key = f"{img_hash}_{scale}_{padding:.3f}_{rate}" if resize else f"{img_hash}_{scale}_raw_{rate}"
+    loop_file = os.path.join(RENDER_CACHE_DIR, key + ".mp4")
+    if os.path.isfile(loop_file):
+        return loop_file
+    with _render_locks_lock:
+        lock = _render_locks.setdefault(key, threading.Lock())
+    with lock:
+        if os.path.isfile(loop_file):
+            return loop_file
+        os.makedirs(RENDER_CACHE_DIR, exist_ok=True)
+        width, height = (int(v) for v in scale.split("x"))
+        png_file = os.path.join(RENDER_CACHE_DIR, f"{img_hash}_{scale}_{padding:.3f}.png")
+        if not resize:
+            png_file = img_path
+        elif not os.path.isfile(png_file):
+            tmp_png = png_file + f".{uuid.uuid4().hex[:8]}.tmp"
+            img_resize(img_path, width, height, 15, padding, tmp_png)
+            os.replace(tmp_png, png_file)
+        # 关键帧间隔 1 秒，循环拼接后 -shortest 截断的误差不超过 1 秒
+        tmp_loop = loop_file + f".{uuid.uuid4().hex[:8]}.mp4"
+        cmd = [
+            'ffmpeg',
+            '-loop', '1',
+            '-framerate', str(rate),
+            '-i', png_file,
+            '-t', str(RENDER_LOOP_SECONDS),
+            '-s', scale,
+            '-pix_fmt', 'yuv420p',
+            '-c:v', 'libx264',
+            '-tune', 'stillimage',
+            '-g', str(rate),
+            '-an',
+            '-y',
+            tmp_loop
+        ]
+        subprocess.run(cmd, capture_output=True, check=True, creationflags=getattr(subprocess, 'CREATE_NO_WINDOW', 0))
+        os.replace(tmp_loop, loop_file)
+    return loop_file
+
+class ASRWorker:
+    """单个文件的处理任务，按 转码 → 识别 → 导出 → 视频合成 分级执行（见 bk_asr.Pipeline）"""
+    def __init__(self, file_path, asr_engine, export_format,ui_self, upload_profile=DEFAULT_UPLOAD_PROFILE):
         self.file_path = file_path
         self.asr_engine = asr_engine
         self.export_format = export_format
+        self.upload_profile = upload_profile
         self.signals = WorkerSignals()
         self.ui_self=ui_self
         self.audio_path = None
-
-    @Slot()
-    def run(self):
+        self.temp_audio = None
+        self.audio_info = None
+        # 去除静音后的时间映射，未启用时为 None
+        self.offset_map = None
+        self.result = None
+        self.result_text = ""
+        # 视频参数在界面线程中读取，流水线线程不再访问控件
+        self.render_video = ui_self.video_checkbox.isChecked()
+        self.use_vad = ui_self.vad_checkbox.isChecked()
+        if self.render_video:
+            self.video_params = (ui_self.img_file or "", ui_self.video_par_s_combo.currentText(),
+                                 ui_self.video_par_r_spin.value(), float(ui_self.video_par_p_spin.value()/100))
+
+    def decode(self):
+        """探测格式后选择 直接上传 / 只复制音频流 / 按上传配置转码（CPU 密集）"""
         try:
-            use_cache = True
-            
-            # 检查文件类型,如果不是音频则转换
-            logging.info("[+]正在进ffmpeg转换")
-            audio_exts = ['.mp3', '.wav']
-            temp_audio="default"
-            if not any(self.file_path.lower().endswith(ext) for ext in audio_exts):
-                temp_audio = self.file_path.rsplit(".", 1)[0] +"_"+str(uuid.uuid4())[:8]+ ".mp3"
-                if not video2audio(self.file_path, temp_audio):
-                    raise Exception("音频转换失败，确保安装ffmpeg")
-                self.audio_path = temp_audio
-            else:
-                self.audio_path = self.file_path
-            
-            # 根据选择的 ASR 引擎实例化相应的类
-            if self.asr_engine == 'B 接口':
-                asr = BcutASR(self.audio_path, use_cache=use_cache)
-            elif self.asr_engine == 'J 接口':
-                asr = JianYingASR(self.audio_path, use_cache=use_cache)
-            elif self.asr_engine == 'K 接口':
-                asr = KuaiShouASR(self.audio_path, use_cache=use_cache)
-            elif self.asr_engine == 'Whisper':
-                # from bk_asr.WhisperASR import WhisperASR
-                # asr = WhisperASR(self.file_path, use_cache=use_cache)
-                raise NotImplementedError("WhisperASR 暂未实现")
+            cache = BaseASR.shared_cache()
+        except (sqlite3.Error, OSError) as e:
+            logging.error(f"缓存不可用，不缓存格式探测结果: {e}")
+            cache = None
+        info = self.audio_info = probe_format(self.file_path, cache)
+        if self.use_vad:
+            # 裁掉静音后上传，识别结果再映射回原始时间轴
+            try:
+                self.audio_path, self.offset_map = trim_silence(
+                    self.file_path, output_args=upload_profile_args(self.upload_profile))
+            except (OSError, RuntimeError) as e:
+                raise Exception(f"音频转换失败，确保安装ffmpeg: {e}")
+            return self
+        mode = decode_mode(self.file_path, info, self.upload_profile)
+        logging.info(f"[+]音频处理方式: {mode} {info}")
+        if mode != "passthrough":
+            # ffmpeg 输出直接读入内存，过大时才落到临时目录
+            try:
+                if mode == "remux":
+                    self.audio_path = remux_to_memory(self.file_path, info["codec"])
+                else:
+                    self.audio_path = transcode_to_memory(self.file_path, self.upload_profile)
+            except (OSError, RuntimeError) as e:
+                raise Exception(f"音频转换失败，确保安装ffmpeg: {e}")
+            if isinstance(self.audio_path, str):
+                self.temp_audio = self.audio_path
+                audio_size = os.path.getsize(self.temp_audio)
             else:
-                raise ValueError(f"未知的 ASR 引擎: {self.asr_engine}")
-
-            logging.info(f"开始处理文件: {self.file_path} 使用引擎: {self.asr_engine}")
-            result = asr.run()
-            
-            # 根据导出格式选择转换方法
-            save_ext = self.export_format.lower()
-            result_text=""
-            if save_ext == 'srt':
-                result_text = result.to_srt()
-            elif save_ext == 'ass':
-                result_text = result.to_ass()
-            elif save_ext == 'txt':
-                result_text = result.to_txt()
-                
+                audio_size = len(self.audio_path)
+            logging.info(f"上传音频压缩: {self.file_path} {os.path.getsize(self.file_path)} -> "
+                         f"{audio_size} 字节 ({self.upload_profile})")
+        else:
+            self.audio_path = self.file_path
+        return self
+
+    def transcribe(self):
+        """上传并提交识别（网络等待为主）
+
+        返回本任务的 Future：必剪等引擎在提交后即返回，等待结果期间不占用流水线线程，
+        结果到达后流水线再把任务交给导出级。
+        """
+        use_cache = True
+        if self.offset_map is not None and not self.audio_path:
+            logging.info(f"未检测到语音: {self.file_path}")
+            self.result = ASRData([])
+            return self
+        # 根据选择的 ASR 引擎实例化相应的类
+        if self.asr_engine == 'B 接口':
+            asr = BcutASR(self.audio_path, use_cache=use_cache)
+        elif self.asr_engine == 'J 接口':
+            asr = JianYingASR(self.audio_path, use_cache=use_cache)
+        elif self.asr_engine == 'K 接口':
+            asr = KuaiShouASR(self.audio_path, use_cache=use_cache)
+        elif self.asr_engine == 'Whisper':
+            # from bk_asr.WhisperASR import WhisperASR
+            # asr = WhisperASR(self.file_path, use_cache=use_cache)
+            raise NotImplementedError("WhisperASR 暂未实现")
+        else:
+            raise ValueError(f"未知的 ASR 引擎: {self.asr_engine}")
+
+        logging.info(f"开始处理文件: {self.file_path} 使用引擎: {self.asr_engine}")
+        done = Future()
+
+        def on_result(future):
+            try:
+                self.result = future.result()
+                if self.offset_map is not None:
+                    self.result = self.offset_map.remap(self.result)
+            except Exception as e:
+                done.set_exception(e)
+                return
             logging.info(f"完成处理文件: {self.file_path} 使用引擎: {self.asr_engine}")
-            save_path = self.file_path.rsplit(".", 1)[0] + "." + save_ext
-            with open(save_path, "w", encoding="utf-8") as f:
-                f.write(result_text)
-
-            #生成视频
-            if self.ui_self.video_checkbox.isChecked():
-                logging.info(f"开始视频合成: {self.file_path},img_file:{self.ui_self.img_file}")
-                temp_video = self.file_path.rsplit(".", 1)[0] + ".mp4"
-                if self.ui_self.img_file is None:
-                    self.ui_self.img_file=""
-                if not audio2video(self.ui_self.img_file,self.audio_path,self.ui_self.video_par_s_combo.currentText(),self.ui_self.video_par_r_spin.value(),float(self.ui_self.video_par_p_spin.value()/100), temp_video):
-                    raise Exception("视频合成视频失败，确保安装ffmpeg")
-                if temp_audio != "default":
-                    os.unlink(temp_audio)
-                logging.info(f"完成视频合成: {self.file_path}")
-            else:
-                if temp_audio != "default":
-                    os.unlink(temp_audio)
+            done.set_result(self)
+
+        asr.run_future().add_done_callback(on_result)
+        return done
+
+    def export(self):
+        """根据导出格式保存字幕，选择全部格式时一次遍历同时写出"""
+        formats = EXPORT_FORMATS if self.export_format == "全部格式" else [self.export_format.lower()]
+        paths = self.result.export(self.file_path.rsplit(".", 1)[0], formats)
+        self.result_text = "\n".join(paths.values())
+        return self
+
+    def render(self):
+        """生成视频（CPU 密集）"""
+        if self.render_video:
+            img_file, scale, rate, padding = self.video_params
+            logging.info(f"开始视频合成: {self.file_path},img_file:{img_file}")
+            temp_video = self.file_path.rsplit(".", 1)[0] + ".mp4"
+            # 视频直接使用源文件中的音频，不使用为上传压缩过的音频；MP4 不支持的编码转为 AAC
+            codec = self.audio_info and self.audio_info["codec"]
+            audio_codec = 'copy' if codec in MP4_COPY_CODECS else 'aac'
+            if not audio2video(img_file, self.file_path, scale, rate, padding, temp_video, audio_codec=audio_codec):
+                raise Exception("视频合成视频失败，确保安装ffmpeg")
+            logging.info(f"完成视频合成: {self.file_path}")
+        return self
+
+    def cleanup(self):
+        self.audio_path = None
+        if self.temp_audio is not None:
+            os.unlink(self.temp_audio)
+            self.temp_audio = None
+
+    def finish(self):
+        self.cleanup()
+        self.signals.finished.emit(self.file_path, self.result_text)
 
-            self.signals.finished.emit(self.file_path, result_text)
-        except Exception as e:
-            logging.error(f"处理文件 {self.file_path} 时出错: {str(e)}")
-            self.signals.errno.emit(self.file_path, f"处理时出错: {str(e)}")
+    def fail(self, e):
+        try:
+            self.cleanup()
+        except OSError:
+            pass
+        logging.error(f"处理文件 {self.file_path} 时出错: {str(e)}")
+        self.signals.errno.emit(self.file_path, f"处理时出错: {str(e)}")
 
 class MyLineEdit(LineEdit):
     def __init__(self,thatself):
@@ -196,12 +321,11 @@ class ASRWidget(QWidget):
         self.video_par_v_combo = None
         self.video_par_frame = None
         self.video_checkbox = None
+        self.vad_checkbox = None
         self.combo_box = None
         self.format_combo = None
         self.init_ui()
-        self.max_threads = os.cpu_count()-1  # 设置最大线程数
-        self.thread_pool = QThreadPool()
-        self.thread_pool.setMaxThreadCount(self.max_threads)
+        self.pipeline = None
         self.processing_queue = []
         self.workers = {}  # 维护文件路径到worker的映射
 
@@ -213,12 +337,14 @@ class ASRWidget(QWidget):
 
         media2srt=QHBoxLayout()
         #并发任务数
+        # 只限制同时上传/识别的任务数，转码与视频合成按 CPU 核数单独调度；
+        # 必剪任务提交后等待结果不占用名额
         tasks_label = BodyLabel("同时最大任务数:", self)
         tasks_label.setFixedWidth(120)
         self.tasks_spin = SpinBox(self)
         # self.video_par_r_spin.setFixedHeight(35)
-        self.tasks_spin.setRange(1, os.cpu_count()-1)
-        self.tasks_spin.setValue(math.ceil(os.cpu_count()/2))
+        self.tasks_spin.setRange(1, 64)
+        self.tasks_spin.setValue(max(8, os.cpu_count()))
         self.tasks_spin.setSingleStep(1)
         media2srt.addWidget(tasks_label)
         media2srt.addWidget(self.tasks_spin)
@@ -238,13 +364,30 @@ class ASRWidget(QWidget):
         format_label = BodyLabel("输出字幕格式:", self)
         format_label.setFixedWidth(120)
         self.format_combo = ComboBox(self)
-        self.format_combo.addItems(['SRT', 'TXT', 'ASS'])
+        self.format_combo.addItems(['SRT', 'TXT', 'ASS', 'LRC', 'JSON', '全部格式'])
         # format_layout.addWidget(format_label)
         # format_layout.addWidget(self.format_combo)
         # layout.addLayout(format_layout)
         media2srt.addWidget(format_label)
         media2srt.addWidget(self.format_combo)
         layout.addLayout(media2srt)
+        # 上传前音频压缩配置
+        profile_layout = QHBoxLayout()
+        profile_label = BodyLabel("上传音频压缩:", self)
+        profile_label.setFixedWidth(120)
+        self.profile_combo = ComboBox(self)
+        self.profile_combo.addItems(list(UPLOAD_PROFILES.keys()))
+        self.profile_combo.setCurrentText(DEFAULT_UPLOAD_PROFILE)
+        profile_layout.addWidget(profile_label)
+        profile_layout.addWidget(self.profile_combo)
+        # 识别前去除静音，减少上传和识别时长
+        vad_label = BodyLabel("识别前去除静音:", self)
+        vad_label.setFixedWidth(120)
+        self.vad_checkbox = QCheckBox()
+        self.vad_checkbox.setChecked(False)
+        profile_layout.addWidget(vad_label)
+        profile_layout.addWidget(self.vad_checkbox)
+        layout.addLayout(profile_layout)
         # 是否生成视频选项
         video_check_layout = QHBoxLayout()
         video_check_label = BodyLabel("图片生成视频:", self)
@@ -370,7 +513,7 @@ class ASRWidget(QWidget):
     def select_file(self):
         """选择文件对话框"""
         files, _ = QFileDialog.getOpenFileNames(self, "选择音频或视频文件", "",
-                                                "Media Files (*.mp3 *.wav *.ogg *.mp4 *.avi *.mov *.ts)")
+                                                "Media Files (*.mp3 *.wav *.ogg *.flac *.m4a *.mp4 *.avi *.mov *.ts)")
         for file in files:
             self.add_file_to_table(file)
         self.update_start_button_state()
@@ -436,8 +579,7 @@ class ASRWidget(QWidget):
                     worker = self.workers[file_path]
                     worker.signals.finished.disconnect(self.update_table)
                     worker.signals.errno.disconnect(self.handle_error)
-                    # QThreadPool 不支持直接终止线程，通常需要设计任务可中断
-                    # 这里仅移除引用
+                    # 流水线中的任务无法直接终止，这里仅移除引用
                     self.workers.pop(file_path, None)
                 self.table.removeRow(row)
                 del_nums=del_nums+1
@@ -451,8 +593,7 @@ class ASRWidget(QWidget):
                 worker = self.workers[file_path]
                 worker.signals.finished.disconnect(self.update_table)
                 worker.signals.errno.disconnect(self.handle_error)
-                # QThreadPool 不支持直接终止线程，通常需要设计任务可中断
-                # 这里仅移除引用
+                # 流水线中的任务无法直接终止，这里仅移除引用
                 self.workers.pop(file_path, None)
             self.table.removeRow(current_row)
             self.update_start_button_state()
@@ -507,9 +648,24 @@ class ASRWidget(QWidget):
         self.processing_queue.append(file_path)
         self.process_next_in_queue()
 
+    def build_pipeline(self):
+        """按当前设置创建处理流水线：转码和视频合成占用 CPU，识别阶段以网络等待为主，可同时进行更多任务"""
+        cpu_count = os.cpu_count() or 2
+        if self.pipeline is not None:
+            self.pipeline.shutdown(wait=False)
+        # 识别阶段每个任务最多同时上传 PART_CONCURRENCY 个分片，连接池需容纳全部并发连接
+        ensure_pool_size(int(self.tasks_spin.value()) * PART_CONCURRENCY)
+        self.pipeline = Pipeline([
+            ("decode", ASRWorker.decode, max(1, cpu_count - 1)),
+            ("asr", ASRWorker.transcribe, int(self.tasks_spin.value())),
+            ("export", ASRWorker.export, 1),
+            # x264 自身是多线程的，同时合成的视频数不宜过多
+            ("render", ASRWorker.render, max(1, cpu_count // 4)),
+        ], on_done=ASRWorker.finish, on_error=ASRWorker.fail)
+        self.pipeline_workers = int(self.tasks_spin.value())
+
     def process_files(self):
         """处理所有未处理的文件"""
-        self.thread_pool.setMaxThreadCount(int(self.tasks_spin.value()))
         for row in range(self.table.rowCount()):
             if self.table.item(row, 1).text() == "未处理":
                 file_path = self.table.item(row, 0).data(Qt.UserRole)
@@ -517,8 +673,11 @@ class ASRWidget(QWidget):
         self.process_next_in_queue()
 
     def process_next_in_queue(self):
-        """处理队列中的下一个文件"""
-        while self.thread_pool.activeThreadCount() < self.max_threads and self.processing_queue:
+        """把队列中的文件交给流水线，并发由流水线各阶段的线程数控制"""
+        # 空闲时按最新的任务数设置重建流水线
+        if self.pipeline is None or (self.pipeline.pending() == 0 and self.pipeline_workers != self.tasks_spin.value()):
+            self.build_pipeline()
+        while self.processing_queue:
             file_path = self.processing_queue.pop(0)
             if file_path not in self.workers:
                 self.process_file(file_path)
@@ -527,11 +686,11 @@ class ASRWidget(QWidget):
         """处理单个文件"""
         selected_engine = self.combo_box.currentText()
         selected_format = self.format_combo.currentText()
-        worker = ASRWorker(file_path, selected_engine, selected_format,self)
+        worker = ASRWorker(file_path, selected_engine, selected_format,self, self.profile_combo.currentText())
         worker.signals.finished.connect(self.update_table)
         worker.signals.errno.connect(self.handle_error)
-        self.thread_pool.start(worker)
         self.workers[file_path] = worker
+        self.pipeline.submit(worker)
 
         row = self.find_row_by_file_path(file_path)
         if row != -1:
@@ -709,31 +868,17 @@ class MainWindow(FluentWindow):
         if title == "更新":
             sys.exit(0)
 
-def video2audio(input_file: str, output: str = "") -> bool:
-    """使用ffmpeg将视频转换为音频"""
-    # 创建output目录
-    output = Path(output)
-    output.parent.mkdir(parents=True, exist_ok=True)
-    output = str(output)
+# 可以直接复制进 MP4 的音频编码，其他编码（vorbis、wma、pcm 等）合成视频时转为 AAC
+MP4_COPY_CODECS = ("mp3", "aac")
 
-    cmd = [
-        'ffmpeg',
-        '-i', input_file,
-        '-ac', '1',
-        '-f', 'mp3',
-        '-af', 'aresample=async=1',
-        '-y',
-        output
-    ]
-    result = subprocess.run(cmd, capture_output=True, check=True, encoding='utf-8', errors='replace',creationflags=subprocess.CREATE_NO_WINDOW)
 
-    if result.returncode == 0 and Path(output).is_file():
-        return True
-    else:
-        return False
+def audio2video(video_file:str,audio_file: str,scale:str,rate:int,padding, output: str = "",
+                audio_codec: str = 'copy') -> bool:
+    """使用ffmpeg将音频与静态图片合成视频
 
-def audio2video(video_file:str,audio_file: str,scale:str,rate:int,padding, output: str = "") -> bool:
-    """使用ffmpeg将视频转换为音频"""
+    画面使用 cached_background 预编码的循环片段，视频流直接复制，不再逐帧编码；
+    audio_codec 为 'copy' 时音频也直接复制，否则按该编码器重新编码。
+    """
     # 创建output目录
     if video_file is None:
         video_file=""
@@ -741,50 +886,42 @@ def audio2video(video_file:str,audio_file: str,scale:str,rate:int,padding, outpu
     output = Path(output)
     output.parent.mkdir(parents=True, exist_ok=True)
     output = str(output)
-    resize_file = video_file
-    tmp_file=False
+    resize = True
     if video_file =="":
         supported_formats = ('.png', '.jpg', '.jpeg')
         files = [audio_file.rsplit(".", 1)[0]+u for u in supported_formats if os.path.isfile(audio_file.rsplit(".", 1)[0]+u)]
         if len(files)!=0:
-            resize_file = img_resize(files[0], int(scale.split("x")[0]), int(scale.split("x")[1]), 15, padding)
-            tmp_file = True
+            video_file = files[0]
         else:
-            resize_file = os.path.join(os.path.dirname(__file__), 'static/100.png')
-    else:
-        # resize_file=video_file.rsplit(".", 1)[0] + '_resize'+ ".png"
-        resize_file=img_resize(video_file, int(scale.split("x")[0]), int(scale.split("x")[1]), 15,padding)
-        tmp_file=True
+            video_file = os.path.join(os.path.dirname(__file__), 'static/100.png')
+            resize = False
 
-    # tmp_image = Image.new('RGBA', (100, 100), (0, 0, 0, 0))
-    # video_file = output.rsplit(".", 1)[0] + ".png"
-    # tmp_image.save(video_file)
+    try:
+        loop_file = cached_background(video_file, scale, padding, rate, resize)
+    except Exception as err:
+        logging.error(f"背景渲染失败: {err}")
+        return False
 
     cmd = [
         'ffmpeg',
-        '-loop','1',
-        '-i', resize_file,
+        '-stream_loop', '-1',
+        '-i', loop_file,
         '-i', audio_file,
-        '-r', str(rate),#帧数
-        '-s', scale,#1280x720  '640x360'
-        '-pix_fmt', 'yuv420p',
-        '-c:v', 'libx264',
-        '-c:a', 'copy',
+        '-map', '0:v:0',
+        '-map', '1:a:0',
+        '-c:v', 'copy',
+        '-c:a', audio_codec,
         '-shortest',
         '-y',
         output
     ]
     logging.info(f'cmd:{cmd}')
     try:
-        result = subprocess.run(cmd, capture_output=True, check=True, encoding='utf-8', errors='replace')
-        if tmp_file:
-            os.unlink(resize_file)
+        subprocess.run(cmd, capture_output=True, check=True, encoding='utf-8', errors='replace')
     except Exception as err:
         logging.error(str(err))
-    if result.returncode == 0 and Path(output).is_file():
-        return True
-    else:
         return False
+    return Path(output).is_file()
 
 def start():
     # enable dpi scale
@@ -0,0 +1,60 @@
+"""ASRData 内存占用基准
+
+模拟字级时间戳的长音频识别结果，对比旧版（普通类，每个实例带 __dict__）与当前 ASRDataSeg 的内存占用。
+
+    python benchmarks/asrdata_memory.py [段数]
+"""
+import os
+import random
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bk_asr.ASRData import ASRData, ASRDataSeg
+
+
+class LegacySeg:
+    """改动前的 ASRDataSeg 存储方式"""
+
+    def __init__(self, text, start_time, end_time):
+        self.text = text
+        self.start_time = start_time
+        self.end_time = end_time
+
+
+def make_words(count: int):
+    """生成字级结果：常用汉字随机组合，文本按接口返回的方式逐个新建字符串"""
+    chars = [chr(c) for c in range(0x4e00, 0x4e00 + 3000)]
+    rng = random.Random(0)
+    t = 0
+    for _ in range(count):
+        duration = rng.randint(80, 400)
+        yield "".join(rng.choice(chars) for _ in range(rng.randint(1, 2))), t, t + duration
+        t += duration + rng.randint(0, 50)
+
+
+def measure(seg_cls, count: int) -> int:
+    words = list(make_words(count))
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    # 复制文本，模拟从 JSON 中解析出的独立字符串对象
+    data = ASRData([seg_cls("".join(list(text)), start, end) for text, start, end in words])
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    assert len(data) == count
+    return used
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 300000
+    legacy = measure(LegacySeg, count)
+    current = measure(ASRDataSeg, count)
+    print(f"{count} 个字级段")
+    print(f"旧版 ASRDataSeg: {legacy / 1024 / 1024:8.1f} MB  {legacy / count:6.1f} B/段")
+    print(f"当前 ASRDataSeg: {current / 1024 / 1024:8.1f} MB  {current / count:6.1f} B/段")
+    print(f"节省 {(1 - current / legacy) * 100:.1f}%")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""字幕解析吞吐量基准
+
+生成 SRT / VTT / YouTube VTT / ASS 测试文件，用 from_subtitle_file 解析并统计每种格式的 MB/s。
+
+    python benchmarks/subtitle_parsers.py [段数]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bk_asr.ASRData import ASRData, ASRDataSeg, from_subtitle_file
+
+
+def vtt_ts(ms: int) -> str:
+    return ASRDataSeg._ms_to_srt_time(ms).replace(",", ".")
+
+
+def make_vtt(data: ASRData, word_level: bool) -> str:
+    # from_vtt 与原实现一样把前两块当作头部跳过，这里补一个 NOTE 块，避免第一条字幕被当作头部
+    lines = ["WEBVTT", "Kind: captions", "Language: zh", "", "NOTE benchmark", ""]
+    for seg in data:
+        lines.append(f"{vtt_ts(seg.start_time)} --> {vtt_ts(seg.end_time)} align:start position:0%")
+        if word_level:
+            mid = (seg.start_time + seg.end_time) // 2
+            lines.append(f"{seg.text}<{vtt_ts(mid)}><c> {seg.text}</c>")
+        else:
+            lines.append(seg.text)
+        lines.append("")
+    return "\n".join(lines)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    # 时间戳保持在 100 小时以内，SRT 时间只有两位小时数，超出的段会被解析器跳过
+    data = ASRData([ASRDataSeg(f"第{i}句字幕内容 subtitle line {i}", i * 1000 % 360000000, i * 1000 % 360000000 + 900)
+                    for i in range(count)])
+    # (文件名, 内容, 应解析出的段数)；YouTube VTT 按字级时间戳拆分，每条字幕两段
+    files = {
+        "srt": ("a.srt", data.to_srt(), count),
+        "vtt": ("a.vtt", make_vtt(data, word_level=False), count),
+        "youtube vtt": ("b.vtt", make_vtt(data, word_level=True), count * 2),
+        "ass": ("a.ass", data.to_ass(), count),
+    }
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for name, (filename, content, expected) in files.items():
+            path = os.path.join(tmp_dir, filename)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(content)
+            size = os.path.getsize(path)
+            start = time.perf_counter()
+            parsed = from_subtitle_file(path)
+            elapsed = time.perf_counter() - start
+            assert len(parsed) == expected, f"{name}: 解析出 {len(parsed)} 段，应为 {expected} 段"
+            print(f"{name:12} {size / 1024 / 1024:7.1f} MB  {len(parsed):8} 段  {elapsed:6.2f}s  "
+                  f"{size / 1024 / 1024 / elapsed:6.1f} MB/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,329 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+
+class LRUCache:
+    """线程安全的内存 LRU 缓存，按条目数和字节数双重限制
+
+    字节数由调用方传入，ASRCache 取结果 JSON 的 UTF-8 字节数，只是估算值：
+    解析后的 Python 对象实际占用的内存通常要大几倍。
+    """
+
+    def __init__(self, max_entries: int = 1000, max_bytes: int = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def set(self, key: str, value, size: int) -> None:
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            if size > self.max_bytes:
+                return
+            self._data[key] = (value, size)
+            self._bytes += size
+            self._evict()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+
+    def resize(self, max_entries: Optional[int] = None, max_bytes: Optional[int] = None) -> None:
+        """调整容量，超出部分立即淘汰"""
+        with self._lock:
+            if max_entries is not None:
+                self.max_entries = max_entries
+            if max_bytes is not None:
+                self.max_bytes = max_bytes
+            self._evict()
+
+    def _evict(self) -> None:
+        while self._data and (len(self._data) > self.max_entries or self._bytes > self.max_bytes):
+            _, (_, size) = self._data.popitem(last=False)
+            self._bytes -= size
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class ASRCache:
+    """基于 SQLite 的识别结果缓存
+
+    每条结果按 key 单独读写，不再整体序列化缓存文件；
+    WAL 模式下读写互不阻塞，各线程使用独立连接。
+    前面挂一层进程内共享的 LRUCache，热点结果无需访问数据库。
+    """
+    _instances = {}
+    _instances_lock = threading.Lock()
+    # 内存命中累计到这么多条后，批量写回数据库的访问时间
+    TOUCH_BATCH = 100
+    # 文件指纹与格式探测结果超过该时长（秒）未使用即删除
+    FILE_INFO_MAX_AGE = 30 * 24 * 3600
+
+    def __init__(self, db_path: str, max_size: int = 512 * 1024 * 1024,
+                 memory_entries: int = 1000, memory_bytes: int = 64 * 1024 * 1024):
+        self.db_path = db_path
+        self.max_size = max_size
+        self.memory = LRUCache(memory_entries, memory_bytes)
+        self._local = threading.local()
+        self._size_lock = threading.Lock()
+        # 内存命中但尚未写回数据库的访问时间 {key: accessed_at}
+        self._touched = {}
+        self._touch_lock = threading.Lock()
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        try:
+            self._open()
+        except sqlite3.DatabaseError as e:
+            # 缓存文件损坏时直接重建，缓存内容可以丢弃
+            logging.error(f"Cache database is corrupted, rebuilding {self.db_path}: {e}")
+            self._reset_db()
+            self._open()
+
+    def _open(self) -> None:
+        self._init_db()
+        self._expire_file_info(self._connect())
+        self._total_size = self._connect().execute("SELECT COALESCE(SUM(size), 0) FROM asr_cache").fetchone()[0]
+
+    def _reset_db(self) -> None:
+        """关闭当前线程的连接并删除数据库文件（含 WAL 与共享内存文件）"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+        for suffix in ("", "-wal", "-shm"):
+            try:
+                os.remove(self.db_path + suffix)
+            except FileNotFoundError:
+                pass
+
+    @classmethod
+    def get_instance(cls, db_path: str, **kwargs) -> 'ASRCache':
+        """按数据库路径返回进程内共享的缓存实例，kwargs 仅在首次创建时生效"""
+        with cls._instances_lock:
+            if db_path not in cls._instances:
+                cls._instances[db_path] = cls(db_path, **kwargs)
+            return cls._instances[db_path]
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            try:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+            except sqlite3.Error:
+                conn.close()
+                raise
+            self._local.conn = conn
+        return conn
+
+    def _init_db(self):
+        conn = self._connect()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS asr_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_asr_cache_accessed ON asr_cache (accessed_at)")
+        for table, column in (("fingerprints", "crc32"), ("probes", "info")):
+            columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+            if columns and "accessed_at" not in columns:
+                # 旧版本建的表没有访问时间，无法按时间清理；内容可以重新计算，直接重建
+                conn.execute(f"DROP TABLE {table}")
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                "path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, inode INTEGER NOT NULL, "
+                f"{column} TEXT NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_accessed ON {table} (accessed_at)")
+
+    def get(self, key: str) -> Optional[dict]:
+        """读取单条缓存，不存在时返回 None"""
+        value = self.memory.get(key)
+        if value is not None:
+            self._touch(key)
+            return value
+        try:
+            conn = self._connect()
+            row = conn.execute("SELECT value FROM asr_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE asr_cache SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            value = json.loads(row[0])
+            self.memory.set(key, value, len(row[0].encode("utf-8")))
+            return value
+        except (sqlite3.Error, json.JSONDecodeError) as e:
+            logging.error(f"Failed to read cache: {e}")
+            return None
+
+    def set(self, key: str, value: dict) -> None:
+        """写入单条缓存，超出容量时淘汰最久未使用的条目"""
+        data = json.dumps(value, ensure_ascii=False)
+        size = len(data.encode("utf-8"))
+        self.memory.set(key, value, size)
+        try:
+            conn = self._connect()
+            row = conn.execute("SELECT size FROM asr_cache WHERE key = ?", (key,)).fetchone()
+            conn.execute(
+                "INSERT OR REPLACE INTO asr_cache (key, value, size, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, data, size, time.time())
+            )
+            with self._size_lock:
+                self._total_size += size - (row[0] if row else 0)
+                if self._total_size > self.max_size:
+                    self._prune(conn)
+        except sqlite3.Error as e:
+            logging.error(f"Failed to save cache: {e}")
+
+    def delete(self, key: str) -> None:
+        self.memory.delete(key)
+        try:
+            conn = self._connect()
+            row = conn.execute("SELECT size FROM asr_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return
+            conn.execute("DELETE FROM asr_cache WHERE key = ?", (key,))
+            with self._size_lock:
+                self._total_size -= row[0]
+        except sqlite3.Error as e:
+            logging.error(f"Failed to delete cache: {e}")
+
+    def _touch(self, key: str) -> None:
+        """记录内存命中的访问时间，攒够一批再写回数据库，避免每次命中都写库"""
+        with self._touch_lock:
+            self._touched[key] = time.time()
+            if len(self._touched) < self.TOUCH_BATCH:
+                return
+        self._flush_touched()
+
+    def _flush_touched(self) -> None:
+        """把累计的访问时间写回数据库，淘汰前调用，热点条目不会因只在内存命中而被删除"""
+        with self._touch_lock:
+            touched, self._touched = self._touched, {}
+        if not touched:
+            return
+        try:
+            self._connect().executemany("UPDATE asr_cache SET accessed_at = ? WHERE key = ?",
+                             [(accessed_at, key) for key, accessed_at in touched.items()])
+        except sqlite3.Error as e:
+            logging.error(f"Failed to update cache access time: {e}")
+
+    def _expire_file_info(self, conn: sqlite3.Connection) -> None:
+        """删除长期未使用的文件指纹与格式探测结果，打开缓存和淘汰结果时调用"""
+        expired_before = time.time() - self.FILE_INFO_MAX_AGE
+        for table in ("fingerprints", "probes"):
+            conn.execute(f"DELETE FROM {table} WHERE accessed_at < ?", (expired_before,))
+
+    def _prune(self, conn: sqlite3.Connection) -> None:
+        """按访问时间从旧到新删除，直到回到容量以内（调用方持有 _size_lock）"""
+        self._flush_touched()
+        self._expire_file_info(conn)
+        stale = []
+        for key, size in conn.execute("SELECT key, size FROM asr_cache ORDER BY accessed_at"):
+            if self._total_size <= self.max_size:
+                break
+            stale.append((key,))
+            self._total_size -= size
+        conn.executemany("DELETE FROM asr_cache WHERE key = ?", stale)
+
+    def get_fingerprint(self, path: str, st: os.stat_result) -> Optional[str]:
+        """按 (路径, 大小, 修改时间, inode) 查找已记录的文件哈希，文件变化时返回 None"""
+        try:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT crc32 FROM fingerprints WHERE path = ? AND size = ? AND mtime_ns = ? AND inode = ?",
+                (path, st.st_size, st.st_mtime_ns, st.st_ino)
+            ).fetchone()
+            if row:
+                conn.execute("UPDATE fingerprints SET accessed_at = ? WHERE path = ?", (time.time(), path))
+        except sqlite3.Error as e:
+            logging.error(f"Failed to read fingerprint: {e}")
+            return None
+        return row[0] if row else None
+
+    def set_fingerprint(self, path: str, st: os.stat_result, crc32_hex: str) -> None:
+        try:
+            self._connect().execute(
+                "INSERT OR REPLACE INTO fingerprints (path, size, mtime_ns, inode, crc32, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (path, st.st_size, st.st_mtime_ns, st.st_ino, crc32_hex, time.time())
+            )
+        except sqlite3.Error as e:
+            logging.error(f"Failed to save fingerprint: {e}")
+
+    def get_probe(self, path: str, st: os.stat_result) -> Optional[dict]:
+        """按文件指纹查找已缓存的格式探测结果，文件变化时返回 None"""
+        try:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT info FROM probes WHERE path = ? AND size = ? AND mtime_ns = ? AND inode = ?",
+                (path, st.st_size, st.st_mtime_ns, st.st_ino)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE probes SET accessed_at = ? WHERE path = ?", (time.time(), path))
+            return json.loads(row[0])
+        except (sqlite3.Error, json.JSONDecodeError) as e:
+            logging.error(f"Failed to read probe: {e}")
+            return None
+
+    def set_probe(self, path: str, st: os.stat_result, info: dict) -> None:
+        try:
+            self._connect().execute(
+                "INSERT OR REPLACE INTO probes (path, size, mtime_ns, inode, info, accessed_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (path, st.st_size, st.st_mtime_ns, st.st_ino, json.dumps(info), time.time())
+            )
+        except sqlite3.Error as e:
+            logging.error(f"Failed to save probe: {e}")
+
+    def stats(self) -> dict:
+        """内存层命中/未命中/淘汰计数及磁盘占用"""
+        stats = self.memory.stats()
+        stats["disk_bytes"] = self._total_size
+        return stats
+
+    def __contains__(self, key: str) -> bool:
+        if key in self.memory:
+            return True
+        try:
+            row = self._connect().execute("SELECT 1 FROM asr_cache WHERE key = ?", (key,)).fetchone()
+        except sqlite3.Error:
+            return False
+        return row is not None
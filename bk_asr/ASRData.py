@@ -1,10 +1,27 @@
+import bisect
+import codecs
+import io
+import itertools
 import json
+import mmap
+import os
+import queue
 import re
-from typing import List
+import sys
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional
 from pathlib import Path
 
 class ASRDataSeg:
+    # 字级时间戳的长音频会产生数十万个段，使用 __slots__ 省去每个实例的 __dict__
+    __slots__ = ("text", "start_time", "end_time")
+
+    # 不超过该长度的文本做驻留，字级结果中重复的字词共用同一个字符串对象
+    INTERN_MAX_LEN = 4
+
     def __init__(self, text, start_time, end_time):
+        if type(text) is str and len(text) <= self.INTERN_MAX_LEN:
+            text = sys.intern(text)
         self.text = text
         self.start_time = start_time
         self.end_time = end_time
@@ -54,9 +71,49 @@ class ASRDataSeg:
         return f"ASRDataSeg({self.text}, {self.start_time}, {self.end_time})"
 
 
+# export 支持的格式
+EXPORT_FORMATS = ("srt", "ass", "lrc", "txt", "json")
+
+
+class _IntervalIndex:
+    """按开始时间排序的区间索引
+
+    starts 为排序后的开始时间，max_ends 为结束时间的前缀最大值（单调不减）。
+    查询时用 bisect 在 starts 上确定右边界，在 max_ends 上确定左边界，
+    之前的段必然已经结束，只需检查两者之间的候选段。
+    """
+
+    def __init__(self, segments: List[ASRDataSeg]):
+        self.source = segments
+        self.size = len(segments)
+        self.order = sorted(segments, key=lambda seg: seg.start_time)
+        self.starts = [seg.start_time for seg in self.order]
+        self.max_ends = []
+        max_end = float('-inf')
+        for seg in self.order:
+            max_end = max(max_end, seg.end_time)
+            self.max_ends.append(max_end)
+
+    def is_stale(self, segments: List[ASRDataSeg]) -> bool:
+        return segments is not self.source or len(segments) != self.size
+
+    def overlapping(self, start_time, end_time) -> List[ASRDataSeg]:
+        lo = bisect.bisect_left(self.max_ends, start_time)
+        hi = bisect.bisect_right(self.starts, end_time)
+        return [seg for seg in self.order[lo:hi] if seg.end_time >= start_time]
+
+    def at(self, t) -> Optional[ASRDataSeg]:
+        lo = bisect.bisect_right(self.max_ends, t)
+        for i in range(bisect.bisect_right(self.starts, t) - 1, lo - 1, -1):
+            if self.order[i].end_time > t:
+                return self.order[i]
+        return None
+
+
 class ASRData:
     def __init__(self, segments: List[ASRDataSeg]):
         self.segments = segments
+        self._index: Optional[_IntervalIndex] = None
 
     def __iter__(self):
         return iter(self.segments)
@@ -64,6 +121,24 @@ class ASRData:
     def __len__(self) -> int:
         return len(self.segments)
     
+    def segments_between(self, start_time, end_time) -> List[ASRDataSeg]:
+        """返回与 [start_time, end_time] 有重叠的段，按开始时间排序"""
+        return self._interval_index().overlapping(start_time, end_time)
+
+    def segment_at(self, t) -> Optional[ASRDataSeg]:
+        """返回 t 时刻正在显示的段（start_time <= t < end_time），有多个时取开始最晚的"""
+        return self._interval_index().at(t)
+
+    def invalidate_index(self) -> None:
+        """直接修改 segments 中某个段的时间后需调用，下次查询时重建索引"""
+        self._index = None
+
+    def _interval_index(self) -> _IntervalIndex:
+        # 首次查询时才建立索引；segments 被替换或增删段后自动重建
+        if self._index is None or self._index.is_stale(self.segments):
+            self._index = _IntervalIndex(self.segments)
+        return self._index
+
     def has_data(self) -> bool:
         """Check if there are any utterances"""
         return len(self.segments) > 0
@@ -93,30 +168,44 @@ class ASRData:
 
     def save(self, save_path: str, ass_style: str = None, layout: str = "原文在上") -> None:
         """Save the ASRData to a file"""
-        # 根据文件后缀名选择保存格式
+        # 根据文件后缀名选择保存格式，逐段写入文件，不在内存中拼出完整内容
         Path(save_path).parent.mkdir(parents=True, exist_ok=True)
         if save_path.endswith('.srt'):
-            self.to_srt(save_path=save_path)
+            _write_chunks(save_path, self.iter_srt())
         elif save_path.endswith('.txt'):
-            with open(save_path, 'w', encoding='utf-8') as f:
-                f.write(self.to_txt())
+            _write_chunks(save_path, self.iter_txt())
+        elif save_path.endswith('.lrc'):
+            _write_chunks(save_path, self.iter_lrc())
         elif save_path.endswith('.json'):
             with open(save_path, 'w', encoding='utf-8') as f:
                 json.dump(self.to_json(), f, ensure_ascii=False)
         elif save_path.endswith('.ass'):
-            self.to_ass(save_path=save_path, style_str=ass_style, layout=layout)
+            _write_chunks(save_path, self.iter_ass(style_str=ass_style, layout=layout))
         else:
             raise ValueError(f"Unsupported file extension: {save_path}")
 
+    def iter_txt(self) -> Iterator[str]:
+        """逐段生成纯文本内容"""
+        for n, seg in enumerate(self.segments):
+            yield f"\n{seg.transcript}" if n else seg.transcript
+
+    def iter_srt(self) -> Iterator[str]:
+        """逐段生成 SRT 内容"""
+        for n, seg in enumerate(self.segments, 1):
+            yield f"{'' if n == 1 else chr(10)}{n}\n{seg.to_srt_ts()}\n{seg.transcript}\n"
+
+    def iter_lrc(self) -> Iterator[str]:
+        """逐段生成 LRC 内容"""
+        for n, seg in enumerate(self.segments):
+            yield f"\n{seg.to_lrc_ts()}{seg.transcript}" if n else f"{seg.to_lrc_ts()}{seg.transcript}"
+
     def to_txt(self) -> str:
         """Convert to plain text subtitle format (without timestamps)"""
-        return "\n".join(seg.transcript for seg in self.segments)
+        return "".join(self.iter_txt())
 
     def to_srt(self, save_path=None) -> str:
         """Convert to SRT subtitle format"""
-        srt_text = "\n".join(
-            f"{n}\n{seg.to_srt_ts()}\n{seg.transcript}\n"
-            for n, seg in enumerate(self.segments, 1))
+        srt_text = "".join(self.iter_srt())
         if save_path:
             with open(save_path, 'w', encoding='utf-8') as f:
                 f.write(srt_text)
@@ -124,30 +213,70 @@ class ASRData:
 
     def to_lrc(self, save_path=None) -> str:
         """Convert to LRC subtitle format"""
-        lrc_text = "\n".join(
-            f"{seg.to_lrc_ts()}{seg.transcript}" for seg in self.segments
-        )
+        lrc_text = "".join(self.iter_lrc())
         if save_path:
             with open(save_path, 'w', encoding='utf-8') as f:
                 f.write(lrc_text)
         return lrc_text
 
     def to_json(self) -> dict:
-        result_json = {}
-        for i, segment in enumerate(self.segments, 1):
-            # 检查是否有换行符
-            if "\n" in segment.text:
-                original_subtitle, translated_subtitle = segment.text.split("\n")
-            else:
-                original_subtitle, translated_subtitle = segment.text, ""
-
-            result_json[str(i)] = {
-                "start_time": segment.start_time,
-                "end_time": segment.end_time,
-                "original_subtitle": original_subtitle,
-                "translated_subtitle": translated_subtitle
-            }
-        return result_json
+        return {str(i): _json_entry(segment) for i, segment in enumerate(self.segments, 1)}
+
+    def export(self, base_path: str, formats: Iterable[str] = EXPORT_FORMATS, ass_style: str = None,
+               layout: str = "原文在上", batch_size: int = 1000) -> Dict[str, str]:
+        """一次遍历同时导出多种格式，返回 {格式: 文件路径}
+
+        base_path 为不含扩展名的输出路径。每段的时间戳只拆分一次，供各格式共用；
+        各格式由独立线程写入各自的文件，遍历线程只负责格式化。
+        """
+        formats = [fmt.lower() for fmt in dict.fromkeys(formats)]
+        for fmt in formats:
+            if fmt not in EXPORT_FORMATS:
+                raise ValueError(f"Unsupported export format: {fmt}")
+        Path(base_path).parent.mkdir(parents=True, exist_ok=True)
+        paths = {fmt: f"{base_path}.{fmt}" for fmt in formats}
+        writers = {fmt: _ChunkWriter(path) for fmt, path in paths.items()}
+        batches = {fmt: [] for fmt in formats}
+        if "ass" in batches:
+            batches["ass"].append(next(self.iter_ass(ass_style, layout)))
+        if "json" in batches:
+            batches["json"].append("{")
+        encode_json = json.JSONEncoder(ensure_ascii=False).encode
+
+        try:
+            for n, seg in enumerate(self.segments, 1):
+                hours, minutes_seconds, millis = _split_ms(seg.start_time)
+                end_hours, end_minutes_seconds, end_millis = _split_ms(seg.end_time)
+                sep = "\n" if n > 1 else ""
+                if "srt" in batches:
+                    batches["srt"].append(
+                        f"{sep}{n}\n{hours:02}:{minutes_seconds},{millis:03} --> "
+                        f"{end_hours:02}:{end_minutes_seconds},{end_millis:03}\n{seg.text}\n")
+                if "ass" in batches:
+                    batches["ass"].append(_ass_dialogue(
+                        seg.text, f"{hours}:{minutes_seconds}.{millis // 10:02}",
+                        f"{end_hours}:{end_minutes_seconds}.{end_millis // 10:02}", layout))
+                if "lrc" in batches:
+                    batches["lrc"].append(f"{sep}{seg.to_lrc_ts()}{seg.text}")
+                if "txt" in batches:
+                    batches["txt"].append(f"{sep}{seg.text}")
+                if "json" in batches:
+                    batches["json"].append(
+                        f'{", " if n > 1 else ""}"{n}": {encode_json(_json_entry(seg))}')
+                if n % batch_size == 0:
+                    for fmt, batch in batches.items():
+                        writers[fmt].put(batch)
+                        batches[fmt] = []
+            if "json" in batches:
+                batches["json"].append("}")
+            for fmt, batch in batches.items():
+                writers[fmt].put(batch)
+        finally:
+            errors = [writer.close() for writer in writers.values()]
+        for error in errors:
+            if error is not None:
+                raise error
+        return paths
 
     def to_ass(self, style_str: str = None, layout: str = "原文在上", save_path: str = None) -> str:
         """转换为ASS字幕格式
@@ -159,6 +288,14 @@ class ASRData:
         Returns:
             ASS格式字幕内容
         """
+        ass_content = "".join(self.iter_ass(style_str, layout))
+        if save_path:
+            with open(save_path, 'w', encoding='utf-8') as f:
+                f.write(ass_content)
+        return ass_content
+
+    def iter_ass(self, style_str: str = None, layout: str = "原文在上") -> Iterator[str]:
+        """逐段生成 ASS 内容，参数同 to_ass"""
         # 默认样式
         if not style_str:
             style_str = (
@@ -172,8 +309,8 @@ class ASRData:
                 "0,0,1,2,0,2,10,10,10,1"
             )
 
-        # 构建ASS文件头
-        ass_content = (
+        # ASS文件头
+        yield (
             "[Script Info]\n"
             "; Script generated by VideoCaptioner\n"
             "; https://github.com/weifeng2333\n"
@@ -185,34 +322,10 @@ class ASRData:
             "Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text\n"
         )
 
-        # 根据布局生成对话内容
+        # 根据布局生成对话内容，每段只转换一次时间戳
         for seg in self.segments:
-            start_time = seg.to_ass_ts()[0]
-            end_time = seg.to_ass_ts()[1]
-            dialogue_template = 'Dialogue: 0,{},{},{},,0,0,0,,{}\n'
-
-            # 检查是否有换行符分隔的原文和译文
-            if "\n" in seg.text:
-                original, translate = seg.text.split("\n")
-                if layout == "译文在上" and translate:
-                    ass_content += dialogue_template.format(start_time, end_time, "Secondary", original)
-                    ass_content += dialogue_template.format(start_time, end_time, "Default", translate)
-                elif layout == "原文在上" and translate:
-                    ass_content += dialogue_template.format(start_time, end_time, "Secondary", translate)
-                    ass_content += dialogue_template.format(start_time, end_time, "Default", original)
-                elif layout == "仅原文":
-                    ass_content += dialogue_template.format(start_time, end_time, "Default", original)
-                elif layout == "仅译文" and translate:
-                    ass_content += dialogue_template.format(start_time, end_time, "Default", translate)
-            else:
-                original = seg.text
-                ass_content += dialogue_template.format(start_time, end_time, "Default", original)
-            # 根据布局生成对话行
-            
-        if save_path:
-            with open(save_path, 'w', encoding='utf-8') as f:
-                f.write(ass_content)
-        return ass_content
+            start_time, end_time = seg.to_ass_ts()
+            yield _ass_dialogue(seg.text, start_time, end_time, layout)
 
     def merge_segments(self, start_index: int, end_index: int, merged_text: str = None):
             """合并从 start_index 到 end_index 的段（包含）。"""
@@ -225,6 +338,7 @@ class ASRData:
             merged_seg = ASRDataSeg(merged_text, merged_start_time, merged_end_time)
             # 替换 segments[start_index:end_index+1] 为 merged_seg
             self.segments[start_index:end_index+1] = [merged_seg]
+            self.invalidate_index()
 
     def merge_with_next_segment(self, index: int) -> None:
         """合并指定索引的段与下一个段。"""
@@ -243,10 +357,144 @@ class ASRData:
         self.segments[index] = merged_seg
         # 删除下一个段
         del self.segments[index + 1]
+        self.invalidate_index()
 
     def __str__(self):
         return self.to_txt()
 
+def _ass_dialogue(text: str, start_time: str, end_time: str, layout: str) -> str:
+    """生成单个段的 ASS 对话行（可能为两行或空）"""
+    dialogue_template = 'Dialogue: 0,{},{},{},,0,0,0,,{}\n'
+    # 检查是否有换行符分隔的原文和译文
+    if "\n" in text:
+        original, translate = text.split("\n")
+        if layout == "译文在上" and translate:
+            return (dialogue_template.format(start_time, end_time, "Secondary", original) +
+                    dialogue_template.format(start_time, end_time, "Default", translate))
+        elif layout == "原文在上" and translate:
+            return (dialogue_template.format(start_time, end_time, "Secondary", translate) +
+                    dialogue_template.format(start_time, end_time, "Default", original))
+        elif layout == "仅原文":
+            return dialogue_template.format(start_time, end_time, "Default", original)
+        elif layout == "仅译文" and translate:
+            return dialogue_template.format(start_time, end_time, "Default", translate)
+        return ""
+    return dialogue_template.format(start_time, end_time, "Default", text)
+
+
+def _split_ms(ms) -> tuple:
+    """毫秒拆分为 (时, "分:秒", 毫秒)，SRT 与 ASS 共用；取整方式与 _ms_to_srt_time/_ms_to_ass_ts 一致"""
+    total_seconds, milliseconds = divmod(int(ms), 1000)
+    minutes, seconds = divmod(total_seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return hours, f"{minutes:02}:{seconds:02}", milliseconds
+
+
+def _json_entry(segment: ASRDataSeg) -> dict:
+    # 检查是否有换行符
+    if "\n" in segment.text:
+        original_subtitle, translated_subtitle = segment.text.split("\n")
+    else:
+        original_subtitle, translated_subtitle = segment.text, ""
+    return {
+        "start_time": segment.start_time,
+        "end_time": segment.end_time,
+        "original_subtitle": original_subtitle,
+        "translated_subtitle": translated_subtitle
+    }
+
+
+class _ChunkWriter:
+    """后台线程把内容块写入单个文件，队列有界，格式化快于写盘时遍历线程会等待"""
+
+    def __init__(self, save_path: str, max_pending: int = 8):
+        self.save_path = save_path
+        self.error = None
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = threading.Thread(target=self._run, name=f"export-{save_path}", daemon=True)
+        self._thread.start()
+
+    def put(self, chunks: List[str]) -> None:
+        if self.error is None:
+            self._queue.put(chunks)
+
+    def close(self):
+        """等待写入完成，返回写入过程中的异常"""
+        self._queue.put(None)
+        self._thread.join()
+        return self.error
+
+    def _run(self) -> None:
+        f = None
+        try:
+            f = open(self.save_path, 'w', encoding='utf-8')
+            while True:
+                chunks = self._queue.get()
+                if chunks is None:
+                    break
+                f.writelines(chunks)
+        except Exception as e:
+            self.error = e
+            # 出错后继续取走队列中的内容，避免生产方阻塞
+            while self._queue.get() is not None:
+                pass
+        finally:
+            if f is not None:
+                f.close()
+
+
+def _write_chunks(save_path: str, chunks: Iterable[str]) -> None:
+    """把生成器产出的内容逐块写入文件"""
+    with open(save_path, 'w', encoding='utf-8') as f:
+        f.writelines(chunks)
+
+
+# 各格式的时间戳模式，模块加载时编译一次
+_SRT_TIME_PATTERN = re.compile(
+    r'(\d{2}):(\d{2}):(\d{1,2})[.,](\d{3})\s-->\s(\d{2}):(\d{2}):(\d{1,2})[.,](\d{3})'
+)
+_VTT_INLINE_PATTERN = re.compile(r'<\d{2}:\d{2}:\d{2}\.\d{3}>|</?c>')
+_YOUTUBE_VTT_TIME_PATTERN = re.compile(
+    r'(\d{2}):(\d{2}):(\d{2}\.\d{3})\s*-->\s*(\d{2}):(\d{2}):(\d{2}\.\d{3})'
+)
+_YOUTUBE_VTT_WORD_PATTERN = re.compile(r'<(\d{2}:\d{2}:\d{2}\.\d{3})>([^<]*)')
+# ASS时间戳格式: H:MM:SS.cc
+_ASS_DIALOGUE_PATTERN = re.compile(
+    r'Dialogue: \d+,(\d+):(\d{2}):(\d{2})\.(\d{2}),(\d+):(\d{2}):(\d{2})\.(\d{2}),(.*?),.*?,\d+,\d+,\d+,.*?,(.*?)$'
+)
+_ASS_TAG_PATTERN = re.compile(r'\{[^}]*\}')
+
+# 编码探测读取的字节数
+_DETECT_SIZE = 64 * 1024
+
+
+def _detect_encoding(file_path: Path) -> str:
+    """只读取文件开头判断编码：BOM 优先，其次尝试 UTF-8，否则按 GBK 处理"""
+    with open(file_path, 'rb') as f:
+        head = f.read(_DETECT_SIZE)
+    if head.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    if head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return 'utf-16'
+    try:
+        # 末尾可能截断在多字节字符中间，按增量方式解码
+        codecs.getincrementaldecoder('utf-8')().decode(head, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        return 'gbk'
+
+
+def _has_youtube_word_timestamps(file_path: Path, encoding: str) -> bool:
+    """YouTube VTT格式包含字级时间戳，用 mmap 直接在字节中查找，不解码整个文件"""
+    if encoding == 'utf-16':
+        return '<c>' in file_path.read_text(encoding=encoding)
+    with open(file_path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return False
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return mm.find(b'<c>') != -1
+
+
 def from_subtitle_file(file_path: str) -> 'ASRData':
     """从文件路径加载ASRData实例
     
@@ -262,26 +510,50 @@ def from_subtitle_file(file_path: str) -> 'ASRData':
     file_path = Path(file_path)
     if not file_path.exists():
         raise FileNotFoundError(f"文件不存在: {file_path}")
-        
+
+    suffix = file_path.suffix.lower()
+    encoding = _detect_encoding(file_path)
     try:
-        content = file_path.read_text(encoding='utf-8')
+        return _parse_subtitle_file(file_path, suffix, encoding)
     except UnicodeDecodeError:
-        content = file_path.read_text(encoding='gbk')
-        
-    suffix = file_path.suffix.lower()
-    
+        # 开头是合法的 UTF-8 但后面不是，才会回退重新解析
+        if encoding != 'utf-8':
+            raise
+        return _parse_subtitle_file(file_path, suffix, 'gbk')
+
+
+def _parse_subtitle_file(file_path: Path, suffix: str, encoding: str) -> 'ASRData':
+    if suffix == '.json':
+        return from_json(json.loads(file_path.read_text(encoding=encoding)))
     if suffix == '.srt':
-        return from_srt(content)
+        parser = _parse_srt
     elif suffix == '.vtt':
-        if '<c>' in content:  # YouTube VTT格式包含字级时间戳
-            return from_youtube_vtt(content)
-        return from_vtt(content)
+        parser = _parse_youtube_vtt if _has_youtube_word_timestamps(file_path, encoding) else _parse_vtt
     elif suffix == '.ass':
-        return from_ass(content)
-    elif suffix == '.json':
-        return from_json(json.loads(content))
+        parser = _parse_ass
     else:
         raise ValueError(f"不支持的文件格式: {suffix}")
+    # 逐行读取，不把整个文件读入内存
+    with open(file_path, encoding=encoding) as f:
+        return ASRData(list(parser(f)))
+
+
+def _iter_blocks(lines: Iterable[str], whitespace_separates: bool = True) -> Iterator[List[str]]:
+    """按空行把行流切分成块，行保留末尾的换行符
+
+    whitespace_separates 为 True 时只含空白字符的行也视为分隔行。
+    """
+    block = []
+    for line in lines:
+        if (line.isspace() if whitespace_separates else line == '\n') or not line:
+            if block:
+                yield block
+                block = []
+        else:
+            block.append(line)
+    if block:
+        yield block
+
 
 def from_json(json_data: dict) -> 'ASRData':
     """从JSON数据创建ASRData实例"""
@@ -306,38 +578,26 @@ def from_srt(srt_str: str) -> 'ASRData':
     :param srt_str: 包含SRT格式字幕的字符串。
     :return: 解析后的ASRData实例。
     """
-    segments = []
-    srt_time_pattern = re.compile(
-        r'(\d{2}):(\d{2}):(\d{1,2})[.,](\d{3})\s-->\s(\d{2}):(\d{2}):(\d{1,2})[.,](\d{3})'
-    )
+    return ASRData(list(_parse_srt(io.StringIO(srt_str, newline=None))))
 
-    for block in re.split(r'\n\s*\n', srt_str.strip()):
-        lines = block.splitlines()
-        if len(lines) < 3:
+
+def _parse_srt(lines: Iterable[str]) -> Iterator[ASRDataSeg]:
+    """逐块解析SRT，块之间以空白行分隔"""
+    for block in _iter_blocks(lines):
+        if len(block) < 3:
             continue
 
-        match = srt_time_pattern.match(lines[1])
+        match = _SRT_TIME_PATTERN.match(block[1])
         if not match:
             continue
 
-        time_parts = list(map(int, match.groups()))
-        start_time = sum([
-            time_parts[0] * 3600000,
-            time_parts[1] * 60000,
-            time_parts[2] * 1000,
-            time_parts[3]
-        ])
-        end_time = sum([
-            time_parts[4] * 3600000,
-            time_parts[5] * 60000,
-            time_parts[6] * 1000,
-            time_parts[7]
-        ])
-
-        text = '\n'.join(lines[2:]).strip()
-        segments.append(ASRDataSeg(text, start_time, end_time))
+        h1, m1, s1, ms1, h2, m2, s2, ms2 = map(int, match.groups())
+        start_time = h1 * 3600000 + m1 * 60000 + s1 * 1000 + ms1
+        end_time = h2 * 3600000 + m2 * 60000 + s2 * 1000 + ms2
+
+        text = ''.join(block[2:]).strip()
+        yield ASRDataSeg(text, start_time, end_time)
 
-    return ASRData(segments)
 
 def from_vtt(vtt_str: str) -> 'ASRData':
     """
@@ -346,47 +606,61 @@ def from_vtt(vtt_str: str) -> 'ASRData':
     :param vtt_str: YouTube VTT格式的字幕字符串
     :return: ASRData实例
     """
-    segments = []
-    # 跳过头部元数据
-    content = vtt_str.split('\n\n')[2:]
-    
-    current_text = ""
-    current_start = 0
-    current_end = 0
-    
-    for block in content:
-        lines = block.strip().split('\n')
-        if not lines:
-            continue
-            
-        # 解析时间戳行
-        timestamp_line = lines[0]
-        if '-->' not in timestamp_line:
-            continue
-            
-        # 提取开始和结束时间
-        times = timestamp_line.split(' --> ')[0]
-        hours, minutes, seconds = times.split(':')
-        seconds, milliseconds = seconds.split('.')
-        start_time = (int(hours) * 3600 + int(minutes) * 60 + int(seconds)) * 1000 + int(milliseconds)
-        
-        times = timestamp_line.split(' --> ')[1].split()[0]
-        hours, minutes, seconds = times.split(':')
+    return ASRData(list(_parse_vtt(io.StringIO(vtt_str, newline=None))))
+
+
+def _parse_vtt(lines: Iterable[str]) -> Iterator[ASRDataSeg]:
+    """逐块解析VTT，跳过前两块（头部元数据）
+
+    块的划分与按 '\n\n' 切分整个字符串一致：连续 n 个换行符构成 n // 2 个分隔符。
+    """
+    def parse_time(ts: str) -> int:
+        hours, minutes, seconds = ts.split(':')
         seconds, milliseconds = seconds.split('.')
-        end_time = (int(hours) * 3600 + int(minutes) * 60 + int(seconds)) * 1000 + int(milliseconds)
-        
-        # 提取并清文本内容
-        if len(lines) > 1:
-            text_line = lines[1]
-            # 移除时间戳和样式标记
-            cleaned_text = re.sub(r'<\d{2}:\d{2}:\d{2}\.\d{3}>', '', text_line)
-            cleaned_text = re.sub(r'</?c>', '', cleaned_text)
-            cleaned_text = cleaned_text.strip()
-            
-            if cleaned_text and cleaned_text != " ":
-                segments.append(ASRDataSeg(cleaned_text, start_time, end_time))
-    
-    return ASRData(segments)
+        return (int(hours) * 3600 + int(minutes) * 60 + int(seconds)) * 1000 + int(milliseconds)
+
+    block_index = 0
+    block = []
+    newlines = 0
+    for line in lines:
+        content = line[:-1] if line.endswith('\n') else line
+        if content:
+            separators = newlines // 2
+            if separators:
+                if block_index >= 2 and block:
+                    seg = _vtt_cue(block, parse_time)
+                    if seg is not None:
+                        yield seg
+                block_index += separators
+                block = []
+            # 块首的空白行等同于被 strip 掉
+            if block or content.strip():
+                block.append(content)
+            newlines = 0
+        if line.endswith('\n'):
+            newlines += 1
+    if block_index >= 2 and block:
+        seg = _vtt_cue(block, parse_time)
+        if seg is not None:
+            yield seg
+
+
+def _vtt_cue(block: List[str], parse_time) -> 'ASRDataSeg':
+    # 解析时间戳行
+    timestamp_line = block[0].lstrip()
+    if '-->' not in timestamp_line:
+        return None
+    start, end = timestamp_line.split(' --> ')[:2]
+    start_time = parse_time(start)
+    end_time = parse_time(end.split()[0])
+
+    # 提取并清理文本内容，移除时间戳和样式标记
+    if len(block) > 1:
+        cleaned_text = _VTT_INLINE_PATTERN.sub('', block[1]).strip()
+        if cleaned_text:
+            return ASRDataSeg(cleaned_text, start_time, end_time)
+    return None
+
 
 def from_youtube_vtt(vtt_str: str) -> 'ASRData':
     """
@@ -395,76 +669,43 @@ def from_youtube_vtt(vtt_str: str) -> 'ASRData':
     :param vtt_str: 包含VTT格式字幕的字符串
     :return: 解析后的ASRData实例
     """
+    return ASRData(list(_parse_youtube_vtt(io.StringIO(vtt_str, newline=None))))
+
+
+def _parse_youtube_vtt(lines: Iterable[str]) -> Iterator[ASRDataSeg]:
+    """逐块解析YouTube VTT，把带 <c> 标记的行拆分为单词段"""
     def parse_timestamp(ts: str) -> int:
         """将时间戳字符串转换为毫秒"""
         h, m, s = ts.split(':')
         return int(float(h) * 3600000 + float(m) * 60000 + float(s) * 1000)
-    
-    def split_timestamped_text(text: str) -> List[ASRDataSeg]:
-        """分离带时间戳的文本为单词段"""
-        # 匹配 <时间戳>文本 的模式
-        pattern = re.compile(r'<(\d{2}:\d{2}:\d{2}\.\d{3})>([^<]*)')
-        matches = list(pattern.finditer(text))
-        word_segments = []
-        
-        for i in range(len(matches) - 1):
-            current_match = matches[i]
-            next_match = matches[i + 1]
-            
-            start_time = parse_timestamp(current_match.group(1))
-            end_time = parse_timestamp(next_match.group(1))
-            word = current_match.group(2).strip()
-            
-            if word:  # 只有当文本不为空时才创建segment
-                word_segments.append(ASRDataSeg(word, start_time, end_time))
-        
-        return word_segments
-    
-    segments = []
-    # 跳过WEBVTT头部
-    blocks = re.split(r'\n\n+', vtt_str.strip())
-    
-    # 时间戳匹配模式
-    timestamp_pattern = re.compile(
-        r'(\d{2}):(\d{2}):(\d{2}\.\d{3})\s*-->\s*(\d{2}):(\d{2}):(\d{2}\.\d{3})'
-    )    
-    for block in blocks:
-        lines = block.strip().split('\n')
-        if not lines:
+
+    for block in _iter_blocks(lines, whitespace_separates=False):
+        # 块首的空白行等同于被 strip 掉
+        block = list(itertools.dropwhile(lambda line: not line.strip(), block))
+        if not block:
             continue
-            
         # 匹配时间戳行
-        match = timestamp_pattern.match(lines[0])
+        match = _YOUTUBE_VTT_TIME_PATTERN.match(block[0].lstrip())
         if not match:
             continue
-            
-        # 计算块的开始和结束时间
-        block_start_time = (
-            int(match.group(1)) * 3600000 +
-            int(match.group(2)) * 60000 +
-            float(match.group(3)) * 1000
-        )
-        block_end_time = (
-            int(match.group(4)) * 3600000 +
-            int(match.group(5)) * 60000 +
-            float(match.group(6)) * 1000
-        )
-        
-        # 获取文本内容
-        text = '\n'.join(lines)
-        
-        timestamp_row = re.search(r'\n(.*?<c>.*?</c>.*)', block)
-        if timestamp_row:
-            text = re.sub(r'<c>|</c>', '', timestamp_row.group(1))
-            block_start_time_string = f"{match.group(1)}:{match.group(2)}:{match.group(3)}"
-            block_end_time_string = f"{match.group(4)}:{match.group(5)}:{match.group(6)}"
-            text = f"<{block_start_time_string}>{text}<{block_end_time_string}>"
-            
-            # 分离每个带时间戳的单词
-            word_segments = split_timestamped_text(text)
-            segments.extend(word_segments)
-    
-    return ASRData(segments)
+
+        # 第一行之后第一个带 <c>...</c> 标记的行
+        timestamp_row = next((line for line in block[1:] if '<c>' in line and '</c>' in line.split('<c>', 1)[1]),
+                             None)
+        if timestamp_row is None:
+            continue
+        text = timestamp_row.rstrip('\n').replace('<c>', '').replace('</c>', '')
+        block_start_time_string = f"{match.group(1)}:{match.group(2)}:{match.group(3)}"
+        block_end_time_string = f"{match.group(4)}:{match.group(5)}:{match.group(6)}"
+        text = f"<{block_start_time_string}>{text}<{block_end_time_string}>"
+
+        # 分离每个带时间戳的单词，相邻两个时间戳之间为一个单词
+        matches = list(_YOUTUBE_VTT_WORD_PATTERN.finditer(text))
+        for current_match, next_match in zip(matches, matches[1:]):
+            word = current_match.group(2).strip()
+            if word:  # 只有当文本不为空时才创建segment
+                yield ASRDataSeg(word, parse_timestamp(current_match.group(1)), parse_timestamp(next_match.group(1)))
+
 
 def from_ass(ass_str: str) -> 'ASRData':
     """
@@ -473,37 +714,27 @@ def from_ass(ass_str: str) -> 'ASRData':
     :param ass_str: 包含ASS格式字幕的字符串
     :return: ASRData实例
     """
-    segments = []
-    # ASS时间戳格式: H:MM:SS.cc
-    ass_time_pattern = re.compile(r'Dialogue: \d+,(\d+:\d{2}:\d{2}\.\d{2}),(\d+:\d{2}:\d{2}\.\d{2}),(.*?),.*?,\d+,\d+,\d+,.*?,(.*?)$')
-    
-    def parse_ass_time(time_str: str) -> int:
-        """将ASS时间戳转换为毫秒"""
-        hours, minutes, seconds = time_str.split(':')
-        seconds, centiseconds = seconds.split('.')
-        return (int(hours) * 3600000 + 
-                int(minutes) * 60000 + 
-                int(seconds) * 1000 + 
-                int(centiseconds) * 10)  # 厘秒转毫秒
-    
-    # 按行处理ASS文件
-    for line in ass_str.splitlines():
-        if line.startswith('Dialogue:'):
-            match = ass_time_pattern.match(line)
-            if match:
-                start_time = parse_ass_time(match.group(1))
-                end_time = parse_ass_time(match.group(2))
-                text = match.group(4)
-                
-                # 清理ASS格式标记
-                text = re.sub(r'\{[^}]*\}', '', text)  # 移除样式标记 {xxx}
-                text = text.replace('\\N', '\n')  # 处理换行符
-                text = text.strip()
-                
-                if text:  # 只有当文本不为空时才创建segment
-                    segments.append(ASRDataSeg(text, start_time, end_time))
-    
-    return ASRData(segments)
+    return ASRData(list(_parse_ass(io.StringIO(ass_str, newline=None))))
+
+
+def _parse_ass(lines: Iterable[str]) -> Iterator[ASRDataSeg]:
+    """逐行解析ASS中的 Dialogue 行"""
+    for line in lines:
+        if not line.startswith('Dialogue:'):
+            continue
+        match = _ASS_DIALOGUE_PATTERN.match(line.rstrip('\r\n'))
+        if not match:
+            continue
+        h1, m1, s1, cs1, h2, m2, s2, cs2 = map(int, match.group(1, 2, 3, 4, 5, 6, 7, 8))
+        # 厘秒转毫秒
+        start_time = h1 * 3600000 + m1 * 60000 + s1 * 1000 + cs1 * 10
+        end_time = h2 * 3600000 + m2 * 60000 + s2 * 1000 + cs2 * 10
+
+        # 清理ASS格式标记：移除样式标记 {xxx}，处理换行符
+        text = _ASS_TAG_PATTERN.sub('', match.group(10)).replace('\\N', '\n').strip()
+        if text:  # 只有当文本不为空时才创建segment
+            yield ASRDataSeg(text, start_time, end_time)
+
 
 if __name__ == '__main__':
     ass_style_str = """[V4+ Styles]
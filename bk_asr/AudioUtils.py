@@ -0,0 +1,320 @@
+import json
+import os
+import re
+import subprocess
+import tempfile
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
+
+# Windows 下隐藏 ffmpeg 控制台窗口
+CREATE_NO_WINDOW = getattr(subprocess, 'CREATE_NO_WINDOW', 0)
+
+# 转码结果超过该大小时写入临时文件，优先使用内存文件系统 /dev/shm
+SPILL_THRESHOLD = 64 * 1024 * 1024
+SPILL_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+
+# 流式解码 PCM 时每次读取的字节数
+PCM_CHUNK_SIZE = 1024 * 1024
+
+_SILENCE_START = re.compile(r'silence_start: (-?\d+(?:\.\d+)?)')
+_SILENCE_END = re.compile(r'silence_end: (\d+(?:\.\d+)?)')
+
+
+def probe_duration(audio_path: str) -> int:
+    """使用 ffprobe 获取音频时长（毫秒）"""
+    cmd = [
+        'ffprobe',
+        '-v', 'error',
+        '-show_entries', 'format=duration',
+        '-of', 'default=noprint_wrappers=1:nokey=1',
+        audio_path
+    ]
+    result = subprocess.run(cmd, capture_output=True, check=True, encoding='utf-8', errors='replace',
+                            creationflags=CREATE_NO_WINDOW)
+    return int(float(result.stdout.strip()) * 1000)
+
+
+def detect_silences(audio_path: str, noise_db: int = -35, min_silence: float = 0.5) -> List[Tuple[int, int]]:
+    """使用 ffmpeg silencedetect 检测静音区间，返回 [(开始毫秒, 结束毫秒)]"""
+    cmd = [
+        'ffmpeg',
+        '-i', audio_path,
+        '-af', f'silencedetect=noise={noise_db}dB:d={min_silence}',
+        '-f', 'null',
+        '-'
+    ]
+    result = subprocess.run(cmd, capture_output=True, check=True, encoding='utf-8', errors='replace',
+                            creationflags=CREATE_NO_WINDOW)
+    silences = []
+    start = None
+    for line in result.stderr.splitlines():
+        match = _SILENCE_START.search(line)
+        if match:
+            start = max(0.0, float(match.group(1)))
+            continue
+        match = _SILENCE_END.search(line)
+        if match and start is not None:
+            silences.append((int(start * 1000), int(float(match.group(1)) * 1000)))
+            start = None
+    return silences
+
+
+def extract_chunk(audio_path: str, start_ms: int, end_ms: int) -> bytes:
+    """截取 [start_ms, end_ms) 区间并编码为 mp3，直接返回字节"""
+    cmd = [
+        'ffmpeg',
+        '-ss', f'{start_ms / 1000:.3f}',
+        '-t', f'{(end_ms - start_ms) / 1000:.3f}',
+        '-i', audio_path,
+        '-ac', '1',
+        '-f', 'mp3',
+        '-'
+    ]
+    result = subprocess.run(cmd, capture_output=True, check=True, creationflags=CREATE_NO_WINDOW)
+    return result.stdout
+
+
+def iter_pcm(audio_path: str, sample_rate: int = 16000, chunk_size: int = PCM_CHUNK_SIZE) -> Iterator[bytes]:
+    """流式解码为单声道 16 位小端 PCM，逐块返回，不在内存中保留整段音频"""
+    cmd = [
+        'ffmpeg',
+        '-i', audio_path,
+        '-ac', '1',
+        '-ar', str(sample_rate),
+        '-f', 's16le',
+        '-'
+    ]
+    with tempfile.TemporaryFile() as err_file:
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=err_file, creationflags=CREATE_NO_WINDOW)
+        try:
+            while True:
+                chunk = proc.stdout.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+            proc.stdout.close()
+            proc.wait()
+        except BaseException:
+            # 包括调用方提前结束迭代（GeneratorExit）
+            proc.kill()
+            proc.stdout.close()
+            proc.wait()
+            raise
+        if proc.returncode != 0:
+            err_file.seek(0)
+            stderr = err_file.read().decode('utf-8', errors='replace')
+            raise RuntimeError(f"ffmpeg 解码失败: {stderr.strip()[-2000:]}")
+
+
+def encode_pcm_stream(chunks: Iterable[bytes], sample_rate: int = 16000,
+                      output_args: Optional[List[str]] = None) -> bytes:
+    """把逐块产生的单声道 16 位 PCM 编码为 mp3 字节，输入边产生边写入编码器
+
+    output_args 为 ffmpeg 输出参数，如 upload_profile_args 的结果，默认按 ffmpeg 默认码率输出 mp3。
+    """
+    cmd = [
+        'ffmpeg',
+        '-f', 's16le',
+        '-ar', str(sample_rate),
+        '-ac', '1',
+        '-i', '-',
+        *(output_args or ['-f', 'mp3']),
+        '-'
+    ]
+    # 输出写入临时文件：只写 stdin 时不读 stdout，输出管道写满会导致两边互相等待
+    with tempfile.TemporaryFile() as out_file, tempfile.TemporaryFile() as err_file:
+        proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=out_file, stderr=err_file,
+                                creationflags=CREATE_NO_WINDOW)
+        try:
+            for chunk in chunks:
+                proc.stdin.write(chunk)
+            proc.stdin.close()
+        except BrokenPipeError:
+            # 编码器已退出，错误信息见下方 stderr
+            pass
+        except BaseException:
+            proc.kill()
+            proc.wait()
+            raise
+        proc.wait()
+        if proc.returncode != 0:
+            err_file.seek(0)
+            stderr = err_file.read().decode('utf-8', errors='replace')
+            raise RuntimeError(f"ffmpeg 编码失败: {stderr.strip()[-2000:]}")
+        out_file.seek(0)
+        return out_file.read()
+
+
+# 上传前的转码配置：采样率、声道、码率越低，上传越快；None 表示不转码，直接上传原文件
+UPLOAD_PROFILES = {
+    "16k 单声道 MP3 (48kbps)": {"sample_rate": 16000, "channels": 1, "bitrate": "48k"},
+    "16k 单声道 MP3 (32kbps)": {"sample_rate": 16000, "channels": 1, "bitrate": "32k"},
+    "原始音质": None,
+}
+DEFAULT_UPLOAD_PROFILE = "16k 单声道 MP3 (48kbps)"
+
+
+def upload_profile_args(profile: str) -> List[str]:
+    """返回转码配置对应的 ffmpeg 输出参数（mp3 格式）"""
+    options = UPLOAD_PROFILES.get(profile)
+    if options is None:
+        return ['-ac', '1', '-f', 'mp3']
+    return [
+        '-ac', str(options["channels"]),
+        '-ar', str(options["sample_rate"]),
+        '-b:a', options["bitrate"],
+        '-f', 'mp3'
+    ]
+
+
+def transcode_to_memory(input_file: str, profile: str, spill_threshold: int = SPILL_THRESHOLD,
+                        spill_dir: str = SPILL_DIR) -> Union[bytearray, str]:
+    """按上传配置转码，ffmpeg 输出直接读入内存，不在源文件旁写临时文件
+
+    结果不超过 spill_threshold 时返回 bytearray，否则写入 spill_dir 下的临时 mp3 并返回其路径，
+    由调用方负责删除。
+    """
+    cmd = [
+        'ffmpeg',
+        '-nostdin',
+        '-loglevel', 'error',
+        '-i', input_file,
+        *upload_profile_args(profile),
+        '-af', 'aresample=async=1',
+        '-'
+    ]
+    return _read_ffmpeg_output(cmd, ".mp3", spill_threshold, spill_dir)
+
+
+def remux_to_memory(input_file: str, codec: str, spill_threshold: int = SPILL_THRESHOLD,
+                    spill_dir: str = SPILL_DIR) -> Union[bytearray, str]:
+    """只复制音频流（-c:a copy）到对应的裸格式容器，不重新编码；返回值同 transcode_to_memory"""
+    cmd = [
+        'ffmpeg',
+        '-nostdin',
+        '-loglevel', 'error',
+        '-i', input_file,
+        '-map', '0:a:0',
+        '-c:a', 'copy',
+        '-f', REMUX_FORMATS[codec],
+        '-'
+    ]
+    return _read_ffmpeg_output(cmd, "." + REMUX_FORMATS[codec], spill_threshold, spill_dir)
+
+
+def _read_ffmpeg_output(cmd: List[str], suffix: str, spill_threshold: int, spill_dir: str) -> Union[bytearray, str]:
+    # stderr 写入临时文件而不是管道：只读 stdout 时，大量错误日志会写满 stderr 管道导致 ffmpeg 阻塞
+    with tempfile.TemporaryFile() as err_file:
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=err_file, creationflags=CREATE_NO_WINDOW)
+        buffer = bytearray()
+        spill = None
+        try:
+            while True:
+                chunk = proc.stdout.read(1024 * 1024)
+                if not chunk:
+                    break
+                if spill is None and len(buffer) + len(chunk) > spill_threshold:
+                    spill = tempfile.NamedTemporaryFile(suffix=suffix, dir=spill_dir, delete=False)
+                    spill.write(buffer)
+                    buffer = None
+                if spill is None:
+                    buffer += chunk
+                else:
+                    spill.write(chunk)
+            proc.stdout.close()
+            proc.wait()
+        except BaseException:
+            proc.kill()
+            proc.wait()
+            if spill is not None:
+                spill.close()
+                os.unlink(spill.name)
+            raise
+        if spill is not None:
+            spill.close()
+        if proc.returncode != 0:
+            if spill is not None:
+                os.unlink(spill.name)
+            err_file.seek(0)
+            stderr = err_file.read().decode('utf-8', errors='replace')
+            raise RuntimeError(f"ffmpeg 转码失败: {stderr.strip()[-2000:]}")
+    return spill.name if spill is not None else buffer
+
+
+# 各引擎可直接接收的扩展名及对应的音频编码
+PASSTHROUGH_CODECS = {
+    "mp3": ("mp3",),
+    "flac": ("flac",),
+    "m4a": ("aac", "alac"),
+    "wav": ("pcm_s16le", "pcm_s24le", "pcm_f32le", "pcm_u8"),
+}
+# 可以只复制音频流、无需重新编码的编码，以及输出到管道时使用的格式
+REMUX_FORMATS = {"mp3": "mp3", "flac": "flac"}
+
+
+def probe_format(input_file: str, cache=None) -> Optional[dict]:
+    """探测第一个音频流的编码、声道数、采样率、码率以及是否含视频画面
+
+    cache 为 ASRCache 时按文件指纹缓存结果，文件未变化时不再调用 ffprobe。
+    ffprobe 不可用或文件无法识别时返回 None。
+    """
+    if cache is not None:
+        path = os.path.abspath(input_file)
+        st = os.stat(path)
+        info = cache.get_probe(path, st)
+        if info is not None:
+            return info
+    cmd = [
+        'ffprobe',
+        '-v', 'error',
+        '-show_entries', 'stream=codec_type,codec_name,channels,sample_rate,bit_rate:stream_disposition=attached_pic',
+        '-of', 'json',
+        input_file
+    ]
+    try:
+        result = subprocess.run(cmd, capture_output=True, check=True, encoding='utf-8', errors='replace',
+                                creationflags=CREATE_NO_WINDOW)
+        streams = json.loads(result.stdout).get("streams", [])
+    except (OSError, subprocess.CalledProcessError, ValueError):
+        return None
+    audio = next((st for st in streams if st.get("codec_type") == "audio"), None)
+    if audio is None:
+        return None
+    info = {
+        "codec": audio.get("codec_name"),
+        "channels": int(audio.get("channels") or 0),
+        "sample_rate": int(audio.get("sample_rate") or 0),
+        "bit_rate": int(audio.get("bit_rate") or 0),
+        # 音频文件中的封面图也是视频流，不算作画面
+        "has_video": any(st.get("codec_type") == "video" and not st.get("disposition", {}).get("attached_pic")
+                         for st in streams),
+    }
+    if cache is not None:
+        cache.set_probe(path, st, info)
+    return info
+
+
+def decode_mode(input_file: str, info: Optional[dict], profile: str) -> str:
+    """根据探测结果选择处理方式：
+
+    - "passthrough": 直接上传原文件
+    - "remux": 只复制音频流，去掉视频等其他流
+    - "transcode": 按上传配置重新编码
+    """
+    ext = input_file.rsplit(".", 1)[-1].lower()
+    options = UPLOAD_PROFILES.get(profile)
+    if info is None:
+        # 无法探测时按扩展名判断
+        return "passthrough" if options is None and ext in ("mp3", "wav") else "transcode"
+    codec = info["codec"]
+    if options is not None:
+        # 已不高于目标参数的 mp3 再转码只会损失音质
+        bitrate = int(options["bitrate"].rstrip("k")) * 1000
+        small_enough = (codec == "mp3" and 0 < info["channels"] <= options["channels"]
+                        and 0 < info["sample_rate"] <= options["sample_rate"] and 0 < info["bit_rate"] <= bitrate)
+        if not small_enough:
+            return "transcode"
+    if codec in PASSTHROUGH_CODECS.get(ext, ()) and not info["has_video"]:
+        return "passthrough"
+    if codec in REMUX_FORMATS:
+        return "remux"
+    return "transcode"
@@ -1,80 +1,177 @@
-import json
+import asyncio
 import logging
+import mmap
 import os
+import sqlite3
 import zlib
 import tempfile
-import threading
+from concurrent.futures import Future
+from typing import Union
 
+from .ASRCache import ASRCache
 from .ASRData import ASRDataSeg, ASRData
 
 
 class BaseASR:
     SUPPORTED_SOUND_FORMAT = ["flac", "m4a", "mp3", "wav"]
-    CACHE_FILE = os.path.join(tempfile.gettempdir(), "bk_asr", "asr_cache.json")
-    _lock = threading.Lock()
+    CACHE_FILE = os.path.join(tempfile.gettempdir(), "bk_asr", "asr_cache.db")
+    # 进程内共享内存缓存的容量
+    CACHE_MEMORY_ENTRIES = 1000
+    CACHE_MEMORY_BYTES = 64 * 1024 * 1024
 
     def __init__(self, audio_path: [str, bytes], use_cache: bool = False):
         self.audio_path = audio_path
-        self.file_binary = None
+        self._file_binary = None
+        self._mmap = None
 
         self.crc32_hex = None
         self.use_cache = use_cache
 
+        self.cache = self._load_cache()
+
         self._set_data()
 
-        self.cache = self._load_cache()
+    @classmethod
+    def shared_cache(cls) -> ASRCache:
+        """返回进程内共享的缓存实例，首次创建时按 CACHE_MEMORY_* 配置内存层容量"""
+        return ASRCache.get_instance(cls.CACHE_FILE, memory_entries=cls.CACHE_MEMORY_ENTRIES,
+                                     memory_bytes=cls.CACHE_MEMORY_BYTES)
 
     def _load_cache(self):
         if not self.use_cache:
-            return {}
-        os.makedirs(os.path.dirname(self.CACHE_FILE), exist_ok=True)
-        with self._lock:
-            if os.path.exists(self.CACHE_FILE):
-                try:
-                    with open(self.CACHE_FILE, 'r', encoding='utf-8') as f:
-                        cache = json.load(f)
-                        if isinstance(cache, dict):
-                            return cache
-                except (json.JSONDecodeError, IOError):
-                    return {}
-            return {}
-
-    def _save_cache(self):
-        if not self.use_cache:
-            return
-        with self._lock:
-            try:
-                with open(self.CACHE_FILE, 'w', encoding='utf-8') as f:
-                    json.dump(self.cache, f, ensure_ascii=False, indent=2)
-                if os.path.exists(self.CACHE_FILE) and os.path.getsize(self.CACHE_FILE) > 10 * 1024 * 1024:
-                    os.remove(self.CACHE_FILE)
-            except IOError as e:
-                logging.error(f"Failed to save cache: {e}")
+            return None
+        try:
+            return self.shared_cache()
+        except (sqlite3.Error, OSError) as e:
+            # 缓存不可用时不影响识别，本实例不使用缓存
+            logging.error(f"Failed to open cache, caching disabled: {e}")
+            self.use_cache = False
+            return None
+
+    @classmethod
+    def cache_stats(cls) -> dict:
+        """返回共享缓存的命中/未命中/淘汰计数"""
+        return cls.shared_cache().stats()
 
     def _set_data(self):
-        if isinstance(self.audio_path, bytes):
-            self.file_binary = self.audio_path
+        if isinstance(self.audio_path, (bytes, bytearray)):
+            self._file_binary = self.audio_path
         else:
             ext = self.audio_path.split(".")[-1].lower()
             assert ext in self.SUPPORTED_SOUND_FORMAT, f"Unsupported sound format: {ext}"
             assert os.path.exists(self.audio_path), f"File not found: {self.audio_path}"
+            # 文件未变化时直接复用指纹索引中的哈希，不读取文件内容
+            if self.use_cache:
+                path = os.path.abspath(self.audio_path)
+                st = os.stat(path)
+                self.crc32_hex = self.cache.get_fingerprint(path, st)
+                if self.crc32_hex:
+                    return
+                self.crc32_hex = self._crc32_file(path)
+                self.cache.set_fingerprint(path, st, self.crc32_hex)
+            else:
+                self.crc32_hex = self._crc32_file(self.audio_path)
+            return
+        self.crc32_hex = format(zlib.crc32(self._file_binary) & 0xFFFFFFFF, '08x')
+
+    @property
+    def file_binary(self) -> Union[bytes, memoryview]:
+        """音频数据，首次访问时才以只读 mmap 映射文件，不整体读入内存"""
+        if self._file_binary is None:
             with open(self.audio_path, "rb") as f:
-                self.file_binary = f.read()
-        crc32_value = zlib.crc32(self.file_binary) & 0xFFFFFFFF
-        self.crc32_hex = format(crc32_value, '08x')
+                if os.fstat(f.fileno()).st_size == 0:
+                    return b""
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._file_binary = memoryview(self._mmap)
+        return self._file_binary
+
+    def close(self) -> None:
+        """释放文件映射，传入 bytes 时无需处理"""
+        if self._mmap is None:
+            return
+        self._file_binary.release()
+        self._file_binary = None
+        try:
+            self._mmap.close()
+        except BufferError:
+            # 仍有切片引用该映射，交给垃圾回收
+            pass
+        self._mmap = None
+
+    @staticmethod
+    def _crc32_file(path: str, chunk_size: int = 1024 * 1024) -> str:
+        """分块计算文件 CRC32，内存占用与文件大小无关"""
+        crc = 0
+        buf = bytearray(chunk_size)
+        view = memoryview(buf)
+        with open(path, "rb") as f:
+            while True:
+                n = f.readinto(buf)
+                if not n:
+                    break
+                crc = zlib.crc32(view[:n], crc)
+        return format(crc & 0xFFFFFFFF, '08x')
 
     def _get_key(self):
         return f"{self.__class__.__name__}-{self.crc32_hex}"
 
     def run(self):
         k = self._get_key()
-        if k in self.cache and self.use_cache:
-            resp_data = self.cache[k]
-        else:
-            resp_data = self._run()
+        resp_data = self.cache.get(k) if self.use_cache else None
+        if resp_data is None:
+            try:
+                resp_data = self._run()
+            finally:
+                self.close()
             # Cache the result
-            self.cache[k] = resp_data
-            self._save_cache()
+            if self.use_cache:
+                self.cache.set(k, resp_data)
+        segments = self._make_segments(resp_data)
+        return ASRData(segments)
+
+    def run_future(self) -> Future:
+        """提交识别并返回 ASRData 的 Future
+
+        支持异步完成的引擎（如必剪）在上传并创建任务后即返回，等待结果期间不占用调用线程；
+        其他引擎在调用线程中执行完毕后返回已完成的 Future。
+        """
+        k = self._get_key()
+        resp_data = self.cache.get(k) if self.use_cache else None
+        result = Future()
+        if resp_data is not None:
+            result.set_result(ASRData(self._make_segments(resp_data)))
+            return result
+        try:
+            pending = self._run_future()
+        finally:
+            self.close()
+
+        def on_done(future: Future) -> None:
+            if future.cancelled():
+                result.cancel()
+                return
+            try:
+                resp_data = future.result()
+                if self.use_cache:
+                    self.cache.set(k, resp_data)
+                result.set_result(ASRData(self._make_segments(resp_data)))
+            except Exception as e:
+                result.set_exception(e)
+
+        pending.add_done_callback(on_done)
+        return result
+
+    async def arun(self):
+        """run 的异步版本，多个任务可在同一事件循环中并发执行"""
+        k = self._get_key()
+        resp_data = self.cache.get(k) if self.use_cache else None
+        if resp_data is None:
+            try:
+                resp_data = await self._arun()
+            finally:
+                self.close()
+            if self.use_cache:
+                self.cache.set(k, resp_data)
         segments = self._make_segments(resp_data)
         return ASRData(segments)
 
@@ -85,5 +182,15 @@ class BaseASR:
         """ Run the ASR service and return the response data. """
         raise NotImplementedError("_run method must be implemented in subclass")
 
+    def _run_future(self) -> Future:
+        """ Start the ASR service and return a Future of the response data. Defaults to running _run. """
+        future = Future()
+        future.set_result(self._run())
+        return future
+
+    async def _arun(self) -> dict:
+        """ Async version of _run. Falls back to running _run in a worker thread. """
+        return await asyncio.to_thread(self._run)
+
 
 
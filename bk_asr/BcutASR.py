@@ -1,6 +1,11 @@
+import asyncio
+import heapq
+import itertools
 import json
 import logging
+import threading
 import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from os import PathLike
 from typing import Optional
 
@@ -8,6 +13,7 @@ import requests
 
 from .ASRData import ASRData, ASRDataSeg
 from .BaseASR import BaseASR
+from .HttpClient import get_async_session, get_session
 
 
 __version__ = "0.0.3"
@@ -26,6 +32,15 @@ API_CREATE_TASK = API_BASE_URL + "/task"
 # 查询结果
 API_QUERY_RESULT = API_BASE_URL + "/task/result"
 
+# 单个文件默认同时上传的分片数
+PART_CONCURRENCY = 4
+
+# 查询请求超时（秒），避免挂起的请求长期占用查询线程
+QUERY_TIMEOUT = 15
+
+# 轮询器同时在途的查询请求数
+QUERY_WORKERS = 8
+
 
 class BcutASR(BaseASR):
     """必剪 语音识别接口"""
@@ -34,9 +49,11 @@ class BcutASR(BaseASR):
         'Content-Type': 'application/json'
     }
 
-    def __init__(self, audio_path: [str, bytes], use_cache: bool = False):
+    def __init__(self, audio_path: [str, bytes], use_cache: bool = False, part_concurrency: int = PART_CONCURRENCY):
         super().__init__(audio_path, use_cache=use_cache)
-        self.session = requests.Session()
+        self.session = get_session()
+        # 单个文件同时上传的分片数，1 为逐片顺序上传
+        self.part_concurrency = max(1, part_concurrency)
         self.task_id = None
         self.__etags = []
 
@@ -54,9 +71,29 @@ class BcutASR(BaseASR):
 
     def upload(self) -> None:
         """申请上传"""
+        resp = self.session.post(
+            API_REQ_UPLOAD,
+            data=self.__upload_request(),
+            headers=self.headers
+        )
+        resp.raise_for_status()
+        self.__set_upload_info(resp.json()["data"])
+        self.__upload_part()
+        self.__commit_upload()
+
+    async def aupload(self) -> None:
+        """申请上传（异步）"""
+        session = await get_async_session()
+        async with session.post(API_REQ_UPLOAD, data=self.__upload_request(), headers=self.headers) as resp:
+            resp.raise_for_status()
+            self.__set_upload_info((await resp.json(content_type=None))["data"])
+        await self.__aupload_part()
+        await self.__acommit_upload()
+
+    def __upload_request(self) -> str:
         if not self.file_binary:
             raise ValueError("none set data")
-        payload = json.dumps({
+        return json.dumps({
             "type": 2,
             "name": "audio.mp3",
             "size": len(self.file_binary),
@@ -64,15 +101,7 @@ class BcutASR(BaseASR):
             "model_id": "8",
         })
 
-        resp = requests.post(
-            API_REQ_UPLOAD,
-            data=payload,
-            headers=self.headers
-        )
-        resp.raise_for_status()
-        resp = resp.json()
-        resp_data = resp["data"]
-
+    def __set_upload_info(self, resp_data: dict) -> None:
         self.__in_boss_key = resp_data["in_boss_key"]
         self.__resource_id = resp_data["resource_id"]
         self.__upload_id = resp_data["upload_id"]
@@ -83,78 +112,244 @@ class BcutASR(BaseASR):
         logging.info(
             f"申请上传成功, 总计大小{resp_data['size'] // 1024}KB, {self.__clips}分片, 分片大小{resp_data['per_size'] // 1024}KB: {self.__in_boss_key}"
         )
-        self.__upload_part()
-        self.__commit_upload()
 
     def __upload_part(self) -> None:
-        """上传音频数据"""
-        for clip in range(self.__clips):
+        """上传音频数据，各分片并发上传，etag 按分片顺序保存"""
+        # memoryview 切片不复制数据
+        payload = memoryview(self.file_binary)
+        self.__etags = [None] * self.__clips
+        start_time = time.perf_counter()
+        workers = min(self.part_concurrency, self.__clips)
+        if workers <= 1:
+            for clip in range(self.__clips):
+                self.__upload_clip(payload, clip)
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                # 逐个取结果，任一分片失败时抛出异常
+                for future in [executor.submit(self.__upload_clip, payload, clip) for clip in range(self.__clips)]:
+                    future.result()
+        logging.info(f"分片上传完成, 并发数{workers}, 耗时{time.perf_counter() - start_time:.2f}s")
+
+    def __upload_clip(self, payload: memoryview, clip: int) -> None:
+        """上传单个分片"""
+        start_range = clip * self.__per_size
+        end_range = (clip + 1) * self.__per_size
+        logging.info(f"开始上传分片{clip}: {start_range}-{end_range}")
+        resp = self.session.put(
+            self.__upload_urls[clip],
+            data=payload[start_range:end_range],
+            headers=self.headers
+        )
+        resp.raise_for_status()
+        etag = resp.headers.get("Etag")
+        self.__etags[clip] = etag
+        logging.info(f"分片{clip}上传成功: {etag}")
+
+    async def __aupload_part(self) -> None:
+        """上传音频数据（异步），以信号量限制单文件的分片并发数"""
+        payload = memoryview(self.file_binary)
+        self.__etags = [None] * self.__clips
+        session = await get_async_session()
+        semaphore = asyncio.Semaphore(self.part_concurrency)
+
+        async def upload_clip(clip: int) -> None:
             start_range = clip * self.__per_size
             end_range = (clip + 1) * self.__per_size
-            logging.info(f"开始上传分片{clip}: {start_range}-{end_range}")
-            resp = requests.put(
-                self.__upload_urls[clip],
-                data=self.file_binary[start_range:end_range],
-                headers=self.headers
-            )
-            resp.raise_for_status()
-            etag = resp.headers.get("Etag")
-            self.__etags.append(etag)
-            logging.info(f"分片{clip}上传成功: {etag}")
+            async with semaphore:
+                async with session.put(self.__upload_urls[clip], data=payload[start_range:end_range],
+                                       headers=self.headers) as resp:
+                    resp.raise_for_status()
+                    self.__etags[clip] = resp.headers.get("Etag")
+            logging.info(f"分片{clip}上传成功: {self.__etags[clip]}")
+
+        await asyncio.gather(*(upload_clip(clip) for clip in range(self.__clips)))
 
     def __commit_upload(self) -> None:
         """提交上传数据"""
-        data = json.dumps({
+        resp = self.session.post(
+            API_COMMIT_UPLOAD,
+            data=self.__commit_request(),
+            headers=self.headers
+        )
+        resp.raise_for_status()
+        self.__download_url = resp.json()["data"]["download_url"]
+        logging.info(f"提交成功")
+
+    async def __acommit_upload(self) -> None:
+        """提交上传数据（异步）"""
+        session = await get_async_session()
+        async with session.post(API_COMMIT_UPLOAD, data=self.__commit_request(), headers=self.headers) as resp:
+            resp.raise_for_status()
+            self.__download_url = (await resp.json(content_type=None))["data"]["download_url"]
+        logging.info(f"提交成功")
+
+    def __commit_request(self) -> str:
+        return json.dumps({
             "InBossKey": self.__in_boss_key,
             "ResourceId": self.__resource_id,
             "Etags": ",".join(self.__etags),
             "UploadId": self.__upload_id,
             "model_id": "8",
         })
-        resp = requests.post(
-            API_COMMIT_UPLOAD,
-            data=data,
-            headers=self.headers
-        )
-        resp.raise_for_status()
-        resp = resp.json()
-        self.__download_url = resp["data"]["download_url"]
-        logging.info(f"提交成功")
 
     def create_task(self) -> str:
         """开始创建转换任务"""
-        resp = requests.post(
+        resp = self.session.post(
             API_CREATE_TASK, json={"resource": self.__download_url, "model_id": "8"}, headers=self.headers
         )
         resp.raise_for_status()
-        resp = resp.json()
-        self.task_id = resp["data"]["task_id"]
+        self.task_id = resp.json()["data"]["task_id"]
+        logging.info(f"任务已创建: {self.task_id}")
+        return self.task_id
+
+    async def acreate_task(self) -> str:
+        """开始创建转换任务（异步）"""
+        session = await get_async_session()
+        async with session.post(API_CREATE_TASK, json={"resource": self.__download_url, "model_id": "8"},
+                                headers=self.headers) as resp:
+            resp.raise_for_status()
+            self.task_id = (await resp.json(content_type=None))["data"]["task_id"]
         logging.info(f"任务已创建: {self.task_id}")
         return self.task_id
 
     def result(self, task_id: Optional[str] = None):
         """查询转换结果"""
-        resp = requests.get(API_QUERY_RESULT, params={"model_id": 7, "task_id": task_id or self.task_id}, headers=self.headers)
-        resp.raise_for_status()
-        resp = resp.json()
-        return resp["data"]
+        return query_result(self.session, task_id or self.task_id)
 
-    def _run(self):
+    def poll_result(self) -> Future:
+        """将当前任务交给全局轮询器，返回识别结果的 Future"""
+        return BcutPoller.get_instance().submit(self.task_id)
+
+    def _run_future(self) -> Future:
+        """上传并创建任务后立即返回，识别结果由全局轮询器在完成时写入 Future"""
         self.upload()
         self.create_task()
-        # 轮询检查任务状态
-        for _ in range(500):
-            task_resp = self.result()
-            if task_resp["state"] == 4:
-                break
-            time.sleep(1)
+        return self.poll_result()
+
+    def _run(self):
+        resp_data = self._run_future().result()
+        logging.info(f"转换成功")
+        return resp_data
+
+    async def _arun(self):
+        await self.aupload()
+        await self.acreate_task()
+        # 轮询仍由全局轮询器完成，这里只等待其结果
+        resp_data = await asyncio.wrap_future(self.poll_result())
         logging.info(f"转换成功")
-        return json.loads(task_resp["result"])
+        return resp_data
 
     def _make_segments(self, resp_data: dict) -> list[ASRDataSeg]:
         return [ASRDataSeg(u['transcript'], u['start_time'], u['end_time']) for u in resp_data['utterances']]
 
 
+def query_result(session, task_id: str) -> dict:
+    """查询任务状态"""
+    resp = session.get(API_QUERY_RESULT, params={"model_id": 7, "task_id": task_id}, headers=BcutASR.headers,
+                       timeout=QUERY_TIMEOUT)
+    resp.raise_for_status()
+    resp = resp.json()
+    return resp["data"]
+
+
+class BcutPoller:
+    """必剪任务的全局轮询器
+
+    由一个后台线程按时间调度所有未完成的 task_id，到期的查询交给小线程池并发执行，
+    单个慢查询不会推迟其他任务；调用方只需等待 Future 或为其添加回调。
+    轮询间隔根据近期任务的完成耗时自适应：预计完成前稀疏查询，
+    超过预期后以指数退避逐步拉长间隔。
+    查询遇到网络错误时按退避间隔重新排队，连续失败 max_errors 次才判定任务失败。
+    """
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, min_interval: float = 1.0, max_interval: float = 15.0, timeout: float = 500.0,
+                 expected_duration: float = 10.0, max_errors: int = 5, query_workers: int = QUERY_WORKERS):
+        self.min_interval = min_interval
+        self.max_errors = max_errors
+        self.max_interval = max_interval
+        self.timeout = timeout
+        # 已完成任务耗时的指数滑动平均
+        self.expected_duration = expected_duration
+        self._heap = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=query_workers, thread_name_prefix="BcutQuery")
+        self._thread = threading.Thread(target=self._loop, name="BcutPoller", daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def get_instance(cls) -> 'BcutPoller':
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    def submit(self, task_id: str) -> Future:
+        """登记任务，完成后 Future 返回解析后的识别结果"""
+        future = Future()
+        now = time.monotonic()
+        with self._cond:
+            heapq.heappush(self._heap, (now + self._next_delay(0, 0), next(self._seq), task_id, future, now, 0, 0))
+            self._cond.notify()
+        return future
+
+    def pending(self) -> int:
+        """排队等待下次查询的任务数（不含查询中的任务）"""
+        with self._cond:
+            return len(self._heap)
+
+    def _next_delay(self, elapsed: float, overdue: int) -> float:
+        if elapsed < self.expected_duration:
+            return max(self.min_interval, (self.expected_duration - elapsed) / 2)
+        return min(self.max_interval, self.min_interval * 2 ** overdue)
+
+    def _loop(self) -> None:
+        while True:
+            with self._cond:
+                while not self._heap or self._heap[0][0] > time.monotonic():
+                    self._cond.wait(self._heap[0][0] - time.monotonic() if self._heap else None)
+                entry = heapq.heappop(self._heap)
+            if entry[3].cancelled():
+                continue
+            self._executor.submit(self._query, *entry[2:])
+
+    def _query(self, task_id: str, future: Future, submitted_at: float, overdue: int, errors: int) -> None:
+        """在查询线程中查询一次，未完成时重新排队"""
+        elapsed = time.monotonic() - submitted_at
+        try:
+            # 每次取共享 Session，连接池被 configure_pool 重建后也使用新的
+            task_resp = query_result(get_session(), task_id)
+            errors = 0
+            if task_resp["state"] == 4:
+                with self._cond:
+                    self.expected_duration = 0.8 * self.expected_duration + 0.2 * elapsed
+                future.set_result(json.loads(task_resp["result"]))
+                return
+        except requests.exceptions.RequestException as e:
+            # 临时的网络错误：退避后重试
+            errors += 1
+            if errors >= self.max_errors:
+                future.set_exception(e)
+                return
+            logging.warning(f"查询任务{task_id}失败({errors}/{self.max_errors})，稍后重试: {e}")
+        except Exception as e:
+            future.set_exception(e)
+            return
+        if elapsed >= self.timeout:
+            future.set_exception(TimeoutError(f"任务{task_id}超时未完成"))
+            return
+        if elapsed >= self.expected_duration:
+            overdue += 1
+        delay = self._next_delay(elapsed, overdue)
+        if errors:
+            delay = max(delay, min(self.max_interval, self.min_interval * 2 ** errors))
+        with self._cond:
+            heapq.heappush(self._heap, (time.monotonic() + delay,
+                                        next(self._seq), task_id, future, submitted_at, overdue, errors))
+            self._cond.notify()
+
 if __name__ == '__main__':
     logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
     # Example usage
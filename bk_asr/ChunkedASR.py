@@ -0,0 +1,95 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple, Type
+
+from .ASRData import ASRData, ASRDataSeg
+from .AudioUtils import detect_silences, extract_chunk, probe_duration
+from .BaseASR import BaseASR
+
+
+class ChunkedASR:
+    """长音频分段识别
+
+    在静音处把音频切成若干段（每段约 chunk_duration），各段前后各多留 overlap 毫秒，
+    用任意引擎并发识别后按段的起点平移时间戳再合并。
+    每段只保留中点落在自己 [切分点, 下一切分点) 内的字幕，重叠区域不会重复。
+    """
+
+    def __init__(self, audio_path: str, engine: Type[BaseASR], chunk_duration: int = 10 * 60 * 1000,
+                 overlap: int = 2000, search_window: int = 60 * 1000, max_workers: int = 4, **engine_kwargs):
+        self.audio_path = audio_path
+        self.engine = engine
+        self.chunk_duration = chunk_duration
+        self.overlap = overlap
+        self.search_window = search_window
+        self.max_workers = max_workers
+        self.engine_kwargs = engine_kwargs
+
+    def split_points(self, duration: int, silences: List[Tuple[int, int]]) -> List[int]:
+        """计算切分点：每个目标位置附近 search_window 内取最近的静音中点，找不到时直接在目标位置切分"""
+        points = [0]
+        target = self.chunk_duration
+        while target < duration - self.chunk_duration // 4:
+            best = target
+            best_dist = self.search_window + 1
+            for start, end in silences:
+                mid = (start + end) // 2
+                dist = abs(mid - target)
+                if dist < best_dist and mid > points[-1]:
+                    best, best_dist = mid, dist
+            points.append(best)
+            target = best + self.chunk_duration
+        points.append(duration)
+        return points
+
+    def chunks(self) -> List[Tuple[int, int, int, int]]:
+        """返回 [(截取起点, 截取终点, 保留起点, 保留终点)]，单位毫秒"""
+        duration = probe_duration(self.audio_path)
+        if duration <= self.chunk_duration:
+            return [(0, duration, 0, duration)]
+        points = self.split_points(duration, detect_silences(self.audio_path))
+        return [(max(0, start - self.overlap), min(duration, end + self.overlap), start, end)
+                for start, end in zip(points, points[1:])]
+
+    def _merge(self, chunks: List[Tuple[int, int, int, int]], results: List[ASRData]) -> ASRData:
+        segments = []
+        last = len(chunks) - 1
+        for i, ((clip_start, _, keep_start, keep_end), asr_data) in enumerate(zip(chunks, results)):
+            for seg in asr_data:
+                start_time = seg.start_time + clip_start
+                end_time = seg.end_time + clip_start
+                mid = (start_time + end_time) / 2
+                if mid < keep_start or (mid >= keep_end and i != last):
+                    continue
+                segments.append(ASRDataSeg(seg.text, start_time, end_time))
+        segments.sort(key=lambda s: s.start_time)
+        return ASRData(segments)
+
+    def _transcribe_chunk(self, chunk: Tuple[int, int, int, int]) -> ASRData:
+        data = extract_chunk(self.audio_path, chunk[0], chunk[1])
+        return self.engine(data, **self.engine_kwargs).run()
+
+    def run(self) -> ASRData:
+        chunks = self.chunks()
+        if len(chunks) == 1:
+            return self.engine(self.audio_path, **self.engine_kwargs).run()
+        logging.info(f"长音频分为{len(chunks)}段并发识别: {self.audio_path}")
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            results = list(executor.map(self._transcribe_chunk, chunks))
+        return self._merge(chunks, results)
+
+    async def arun(self) -> ASRData:
+        """run 的异步版本，各段识别在同一事件循环中并发执行"""
+        chunks = await asyncio.to_thread(self.chunks)
+        if len(chunks) == 1:
+            return await self.engine(self.audio_path, **self.engine_kwargs).arun()
+        semaphore = asyncio.Semaphore(self.max_workers)
+
+        async def transcribe(chunk):
+            async with semaphore:
+                data = await asyncio.to_thread(extract_chunk, self.audio_path, chunk[0], chunk[1])
+                return await self.engine(data, **self.engine_kwargs).arun()
+
+        results = await asyncio.gather(*(transcribe(chunk) for chunk in chunks))
+        return self._merge(chunks, results)
@@ -0,0 +1,135 @@
+import asyncio
+import threading
+import uuid
+import weakref
+from typing import Dict, List, Optional, Tuple, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+# 连接池配置：缓存的主机数、每个主机保持的长连接数
+POOL_CONNECTIONS = 16
+POOL_MAXSIZE = 32
+# 异步接口每个主机的并发连接上限
+ASYNC_LIMIT_PER_HOST = 100
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+# 每个事件循环各自持有一个 aiohttp.ClientSession
+_async_sessions = weakref.WeakKeyDictionary()
+
+
+def _build_session() -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def get_session() -> requests.Session:
+    """返回进程内共享的 Session，各引擎复用同一组按主机划分的长连接"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session()
+    return _session
+
+
+def ensure_pool_size(pool_maxsize: int) -> None:
+    """保证每个主机的长连接数不少于 pool_maxsize，已足够时不重建 Session"""
+    if pool_maxsize > POOL_MAXSIZE:
+        configure_pool(pool_maxsize=pool_maxsize)
+
+
+def configure_pool(pool_connections: int = None, pool_maxsize: int = None) -> None:
+    """调整连接池大小，之后获取的 Session 使用新配置"""
+    global _session, POOL_CONNECTIONS, POOL_MAXSIZE
+    with _session_lock:
+        if pool_connections is not None:
+            POOL_CONNECTIONS = pool_connections
+        if pool_maxsize is not None:
+            POOL_MAXSIZE = pool_maxsize
+        old, _session = _session, _build_session()
+    if old is not None:
+        old.close()
+
+
+async def get_async_session():
+    """返回当前事件循环共享的 aiohttp.ClientSession（aiohttp 为可选依赖）"""
+    try:
+        import aiohttp
+    except ImportError:
+        raise ImportError("异步接口需要安装 aiohttp: pip install aiohttp")
+    loop = asyncio.get_running_loop()
+    session = _async_sessions.get(loop)
+    if session is None or session.closed:
+        connector = aiohttp.TCPConnector(limit=0, limit_per_host=ASYNC_LIMIT_PER_HOST)
+        session = aiohttp.ClientSession(connector=connector)
+        _async_sessions[loop] = session
+    return session
+
+
+async def close_async_session() -> None:
+    """关闭当前事件循环的 ClientSession，应在事件循环结束前调用"""
+    session = _async_sessions.pop(asyncio.get_running_loop(), None)
+    if session is not None:
+        await session.close()
+
+
+class MultipartStream:
+    """流式 multipart/form-data 请求体
+
+    文件内容以 memoryview 切片逐块交给 requests 发送，不拼接完整请求体，
+    上传时额外内存只有表单头和一个发送块。
+    """
+
+    def __init__(self, fields: Dict[str, str], files: List[Tuple[str, str, Buffer, str]]):
+        self.boundary = uuid.uuid4().hex
+        self._parts: List[memoryview] = []
+        for name, value in fields.items():
+            self._parts.append(memoryview(
+                f'--{self.boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode('utf-8')
+            ))
+        for name, filename, data, content_type in files:
+            self._parts.append(memoryview(
+                f'--{self.boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+                f'Content-Type: {content_type}\r\n\r\n'.encode('utf-8')
+            ))
+            self._parts.append(memoryview(data).cast('B'))
+            self._parts.append(memoryview(b'\r\n'))
+        self._parts.append(memoryview(f'--{self.boundary}--\r\n'.encode('utf-8')))
+        self._length = sum(len(p) for p in self._parts)
+        self._index = 0
+        self._offset = 0
+
+    @property
+    def content_type(self) -> str:
+        return f"multipart/form-data; boundary={self.boundary}"
+
+    def read(self, size: int = -1) -> memoryview:
+        """返回下一段数据（不超过 size 字节），读完后返回空"""
+        while self._index < len(self._parts):
+            part = self._parts[self._index]
+            if self._offset < len(part):
+                end = len(part) if size is None or size < 0 else min(len(part), self._offset + size)
+                chunk = part[self._offset:end]
+                self._offset = end
+                return chunk
+            self._index += 1
+            self._offset = 0
+        return memoryview(b'')
+
+    async def __aiter__(self):
+        """供 aiohttp 以异步迭代方式发送，需同时设置 Content-Length"""
+        while True:
+            chunk = self.read(64 * 1024)
+            if not chunk:
+                break
+            yield chunk
+
+    def __len__(self) -> int:
+        return self._length
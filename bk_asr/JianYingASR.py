@@ -1,26 +1,50 @@
 import datetime
+import functools
 import hashlib
 import hmac
 import json
+import logging
+import asyncio
 import os
+import threading
 import time
 import uuid
-from typing import Dict, Tuple, Union
+import zlib
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Tuple, Union
 
 import requests
 
 from .ASRData import ASRDataSeg
 from .BaseASR import BaseASR
-
+from .HttpClient import get_async_session, get_session
+
+API_BASE_URL = "https://lv-pc-api-sinfonlinec.ulikecam.com"
+SIGN_URL = 'https://asrtools-update.bkfeng.top/sign'
+# 同一时间窗口内复用签名，device-time 取窗口起点
+SIGN_WINDOW = 60
+# 上传 STS 凭证的默认有效期及提前刷新的余量（秒）
+CREDENTIALS_TTL = 30 * 60
+CREDENTIALS_REFRESH_MARGIN = 60
+# 超过该大小的文件分片上传
+UPLOAD_PART_SIZE = 10 * 1024 * 1024
+UPLOAD_PART_RETRIES = 3
+# 查询结果的轮询参数（秒）
+QUERY_MIN_INTERVAL = 1.0
+QUERY_MAX_INTERVAL = 10.0
+QUERY_TIMEOUT = 600.0
+VOD_URL = "https://vod.bytedanceapi.com/"
 
 # from ASRData import ASRDataSeg
 # from BaseASR import BaseASR
 
 class JianYingASR(BaseASR):
     def __init__(self, audio_path: Union[str, bytes], use_cache: bool = False, need_word_time_stamp: bool = False,
-                 start_time: float = 0, end_time: float = 6000):
+                 start_time: float = 0, end_time: float = 6000, sign_url: Optional[str] = None):
         super().__init__(audio_path, use_cache)
         self.audio_path = audio_path
+        self.session = get_session()
+        self.signer = SignClient.get_instance(sign_url or SIGN_URL)
         self.end_time = end_time
         self.start_time = start_time
 
@@ -35,14 +59,25 @@ class JianYingASR(BaseASR):
         self.upload_id = None
         self.session_key = None
         self.upload_hosts = None
+        # 已上传成功的分片 {partNumber: crc32}，重试 upload() 时跳过
+        self.uploaded_parts: Dict[int, str] = {}
+        self.bytes_sent = 0
+        # 已提交任务的 query_id，重试时直接继续轮询
+        self.query_id: Optional[str] = None
 
         self.need_word_time_stamp = need_word_time_stamp
         self.tdid = "3943278516897751" if datetime.datetime.now().year != 2024 else f"{uuid.getnode():012d}"
 
     def submit(self) -> str:
         """Submit the task"""
-        url = "https://lv-pc-api-sinfonlinec.ulikecam.com/lv/v1/audio_subtitle/submit"
-        payload = {
+        headers = self._signed_headers('/lv/v1/audio_subtitle/submit')
+        response = self.session.post(API_BASE_URL + '/lv/v1/audio_subtitle/submit', json=self._submit_payload(),
+                                     headers=headers)
+        query_id = response.json()['data']['id']
+        return query_id
+
+    def _submit_payload(self) -> dict:
+        return {
             "adjust_endtime": 200,
             "audio": self.store_uri,
             "caption_type": 2,
@@ -52,17 +87,21 @@ class JianYingASR(BaseASR):
             "words_per_line": 16
         }
 
-        sign, device_time = self._generate_sign_parameters(url='/lv/v1/audio_subtitle/submit', pf='4', appvr='4.0.0',
-                                                           tdid=self.tdid)
-        headers = self._build_headers(device_time, sign)
-        response = requests.post(url, json=payload, headers=headers)
-        query_id = response.json()['data']['id']
-        return query_id
-
     def upload(self):
-        """Upload the file"""
-        self._upload_sign()
-        self._upload_auth()
+        """Upload the file
+
+        数据只发送一次：小文件单个分片上传，大文件按 UPLOAD_PART_SIZE 分片上传，
+        失败后再次调用 upload() 会沿用同一 uploadID，只补传未完成的分片。
+        """
+        if not self.uploaded_parts:
+            self._upload_sign()
+            try:
+                self._upload_auth()
+            except KeyError:
+                # 缓存的凭证已失效，重新获取后重试一次
+                UploadCredentials.get_instance().invalidate(self.tdid)
+                self._upload_sign()
+                self._upload_auth()
         self._upload_file()
         self._upload_check()
         uri = self._upload_commit()
@@ -70,32 +109,133 @@ class JianYingASR(BaseASR):
 
     def query(self, query_id: str):
         """Query the task"""
-        url = "https://lv-pc-api-sinfonlinec.ulikecam.com/lv/v1/audio_subtitle/query"
-        payload = {
+        headers = self._signed_headers('/lv/v1/audio_subtitle/query')
+        response = self.session.post(API_BASE_URL + '/lv/v1/audio_subtitle/query', json=self._query_payload(query_id),
+                                     headers=headers)
+        return response.json()
+
+    @staticmethod
+    def _query_payload(query_id: str) -> dict:
+        return {
             "id": query_id,
             "pack_options": {"need_attribute": True}
         }
-        sign, device_time = self._generate_sign_parameters(url='/lv/v1/audio_subtitle/query', pf='4', appvr='4.0.0',
-                                                           tdid=self.tdid)
-        headers = self._build_headers(device_time, sign)
-        response = requests.post(url, json=payload, headers=headers)
-        return response.json()
 
     def _run(self, callback=None):
         # logging.info("正在上传文件...")
+        job = self.resume_job()
+        if job is not None:
+            if callback:
+                callback(60, "获取结果...")
+            try:
+                return self._finish_job(job.wait(), callback)
+            except (TimeoutError, RuntimeError) as e:
+                # 续轮询的任务已失效，丢弃后在本次调用中重新上传提交
+                logging.warning(f"已提交的任务{job.query_id}不可用，重新上传: {e}")
+                self._forget_job()
         if callback:
             callback(20, "正在上传...")
         self.upload()
         if callback:
             callback(50, "提交任务...")
-        query_id = self.submit()
+        job = self.submit_job()
         if callback:
             callback(60, "获取结果...")
-        resp_data = self.query(query_id)
+        try:
+            resp_data = job.wait()
+        except RuntimeError:
+            # 服务端返回错误，任务不会再完成；超时则保留 query_id 以便稍后继续轮询
+            self._forget_job()
+            raise
+        return self._finish_job(resp_data, callback)
+
+    async def _arun(self):
+        job = self.resume_job()
+        if job is not None:
+            try:
+                return self._finish_job(await job.await_result())
+            except (TimeoutError, RuntimeError) as e:
+                logging.warning(f"已提交的任务{job.query_id}不可用，重新上传: {e}")
+                self._forget_job()
+        await self.aupload()
+        job = await self.asubmit_job()
+        try:
+            resp_data = await job.await_result()
+        except RuntimeError:
+            self._forget_job()
+            raise
+        return self._finish_job(resp_data)
+
+    def _finish_job(self, resp_data: dict, callback=None) -> dict:
+        self._forget_job()
         if callback:
             callback(100, "转录完成")
         return resp_data
 
+    def submit_job(self) -> 'JianYingJob':
+        """提交任务并返回任务句柄，query_id 会持久化以便中断后继续轮询"""
+        return self._remember_job(self.submit())
+
+    async def asubmit_job(self) -> 'JianYingJob':
+        """提交任务并返回任务句柄（异步）"""
+        return self._remember_job(await self.asubmit())
+
+    def resume_job(self) -> Optional['JianYingJob']:
+        """返回此前已提交但未取得结果的任务句柄，不存在时返回 None"""
+        query_id = self.query_id
+        if query_id is None and self.use_cache:
+            pending = self.cache.get(self._job_key())
+            query_id = pending and pending.get('query_id')
+        if not query_id:
+            return None
+        logging.info(f"继续轮询已提交的任务: {query_id}")
+        self.query_id = query_id
+        return JianYingJob(self, query_id)
+
+    def _remember_job(self, query_id: str) -> 'JianYingJob':
+        self.query_id = query_id
+        if self.use_cache:
+            self.cache.set(self._job_key(), {'query_id': query_id, 'submitted_at': time.time()})
+        return JianYingJob(self, query_id)
+
+    def _forget_job(self) -> None:
+        self.query_id = None
+        if self.use_cache:
+            self.cache.delete(self._job_key())
+
+    def _job_key(self) -> str:
+        return f"{self._get_key()}-query_id"
+
+    async def aupload(self):
+        """Upload the file (async)"""
+        if not self.uploaded_parts:
+            await self._aupload_sign()
+            try:
+                await self._aupload_auth()
+            except KeyError:
+                UploadCredentials.get_instance().invalidate(self.tdid)
+                await self._aupload_sign()
+                await self._aupload_auth()
+        await self._aupload_file()
+        await self._aupload_check()
+        return await self._aupload_commit()
+
+    async def asubmit(self) -> str:
+        """Submit the task (async)"""
+        headers = await self._asigned_headers('/lv/v1/audio_subtitle/submit')
+        session = await get_async_session()
+        async with session.post(API_BASE_URL + '/lv/v1/audio_subtitle/submit', json=self._submit_payload(),
+                                headers=headers) as response:
+            return (await response.json(content_type=None))['data']['id']
+
+    async def aquery(self, query_id: str):
+        """Query the task (async)"""
+        headers = await self._asigned_headers('/lv/v1/audio_subtitle/query')
+        session = await get_async_session()
+        async with session.post(API_BASE_URL + '/lv/v1/audio_subtitle/query', json=self._query_payload(query_id),
+                                headers=headers) as response:
+            return await response.json(content_type=None)
+
     def _make_segments(self, resp_data: dict) -> list[ASRDataSeg]:
         if self.need_word_time_stamp:
             return [ASRDataSeg(w['text'].strip(), w['start_time'], w['end_time']) for u in
@@ -108,29 +248,20 @@ class JianYingASR(BaseASR):
 
     def _generate_sign_parameters(self, url: str, pf: str = '4', appvr: str = '4.0.0', tdid='') -> \
             Tuple[str, str]:
-        """Generate signature and timestamp via an HTTP request"""
-        current_time = str(int(time.time()))
-        data = {
-            'url': url,
-            'current_time': current_time,
-            'pf': pf,
-            'appvr': appvr,
-            'tdid': self.tdid
-        }
-        # Replace with your actual endpoint URL
-        get_sign_url = 'https://asrtools-update.bkfeng.top/sign'
-        try:
-            response = requests.post(get_sign_url, json=data)
-            response.raise_for_status()
-            response_data = response.json()
-            sign = response_data.get('sign')
-            if not sign:
-                raise ValueError("No 'sign' in response")
-        except requests.exceptions.RequestException as e:
-            raise SystemExit(f"HTTP Request failed: {e}")
-        except ValueError as ve:
-            raise SystemExit(f"Invalid response: {ve}")
-        return sign.lower(), current_time
+        """Generate signature and timestamp, reusing cached signatures of the current time window"""
+        return self.signer.sign(url, self.tdid, pf, appvr)
+
+    async def _agenerate_sign_parameters(self, url: str, pf: str = '4', appvr: str = '4.0.0') -> Tuple[str, str]:
+        """Generate signature and timestamp (async)"""
+        return await self.signer.asign(url, self.tdid, pf, appvr)
+
+    def _signed_headers(self, url: str) -> Dict[str, str]:
+        sign, device_time = self._generate_sign_parameters(url=url, pf='4', appvr='4.0.0', tdid=self.tdid)
+        return self._build_headers(device_time, sign)
+
+    async def _asigned_headers(self, url: str) -> Dict[str, str]:
+        sign, device_time = await self._agenerate_sign_parameters(url=url, pf='4', appvr='4.0.0')
+        return self._build_headers(device_time, sign)
 
     def _build_headers(self, device_time: str, sign: str) -> Dict[str, str]:
         """Build headers for requests"""
@@ -144,32 +275,60 @@ class JianYingASR(BaseASR):
             'tdid': self.tdid,
         }
 
-    def _uplosd_headers(self):
+    def _uplosd_headers(self, crc32_hex: Optional[str] = None):
         headers = {
             'User-Agent': "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/81.0.4044.138 Safari/537.36 Thea/1.0.1",
             'Authorization': self.auth,
-            'Content-CRC32': self.crc32_hex,
+            'Content-CRC32': crc32_hex or self.crc32_hex,
         }
         return headers
 
     def _upload_sign(self):
-        """Get upload sign"""
-        url = "https://lv-pc-api-sinfonlinec.ulikecam.com/lv/v1/upload_sign"
+        """Get upload sign, reusing cached STS credentials until shortly before they expire"""
+        credentials = UploadCredentials.get_instance().get(self.tdid, self._fetch_upload_sign)
+        return self._set_credentials(credentials)
+
+    async def _aupload_sign(self):
+        """Get upload sign (async)"""
+        credentials = await UploadCredentials.get_instance().aget(self.tdid, self._afetch_upload_sign)
+        return self._set_credentials(credentials)
+
+    def _fetch_upload_sign(self) -> dict:
         payload = json.dumps({"biz": "pc-recognition"})
-        sign, device_time = self._generate_sign_parameters(url='/lv/v1/upload_sign', pf='4', appvr='4.0.0',
-                                                           tdid=self.tdid)
-        headers = self._build_headers(device_time, sign)
-        response = requests.post(url, data=payload, headers=headers)
+        headers = self._signed_headers('/lv/v1/upload_sign')
+        response = self.session.post(API_BASE_URL + '/lv/v1/upload_sign', data=payload, headers=headers)
         response.raise_for_status()
-        login_data = response.json()
-        self.access_key = login_data['data']['access_key_id']
-        self.secret_key = login_data['data']['secret_access_key']
-        self.session_token = login_data['data']['session_token']
+        return response.json()['data']
+
+    async def _afetch_upload_sign(self) -> dict:
+        payload = json.dumps({"biz": "pc-recognition"})
+        headers = await self._asigned_headers('/lv/v1/upload_sign')
+        session = await get_async_session()
+        async with session.post(API_BASE_URL + '/lv/v1/upload_sign', data=payload, headers=headers) as response:
+            response.raise_for_status()
+            return (await response.json(content_type=None))['data']
+
+    def _set_credentials(self, credentials: dict):
+        self.access_key = credentials['access_key_id']
+        self.secret_key = credentials['secret_access_key']
+        self.session_token = credentials['session_token']
         return self.access_key, self.secret_key, self.session_token
 
     def _upload_auth(self):
         """Get upload authorization"""
-        if isinstance(self.audio_path, bytes):
+        url, headers = self._upload_auth_request()
+        response = self.session.get(url, headers=headers)
+        return self._set_store_infos(response.json())
+
+    async def _aupload_auth(self):
+        """Get upload authorization (async)"""
+        url, headers = self._upload_auth_request()
+        session = await get_async_session()
+        async with session.get(url, headers=headers) as response:
+            return self._set_store_infos(await response.json(content_type=None))
+
+    def _upload_auth_request(self) -> Tuple[str, Dict[str, str]]:
+        if isinstance(self.audio_path, (bytes, bytearray)):
             file_size = len(self.audio_path)
         else:
             file_size = os.path.getsize(self.audio_path)
@@ -185,9 +344,9 @@ class JianYingASR(BaseASR):
         signature = aws_signature(self.secret_key, request_parameters, headers, region="cn", service="vod")
         authorization = f"AWS4-HMAC-SHA256 Credential={self.access_key}/{datestamp}/cn/vod/aws4_request, SignedHeaders=x-amz-date;x-amz-security-token, Signature={signature}"
         headers["authorization"] = authorization
-        response = requests.get(f"https://vod.bytedanceapi.com/?{request_parameters}", headers=headers)
-        store_infos = response.json()
+        return f"{VOD_URL}?{request_parameters}", headers
 
+    def _set_store_infos(self, store_infos: dict):
         self.store_uri = store_infos['Result']['UploadAddress']['StoreInfos'][0]['StoreUri']
         self.auth = store_infos['Result']['UploadAddress']['StoreInfos'][0]['Auth']
         self.upload_id = store_infos['Result']['UploadAddress']['StoreInfos'][0]['UploadID']
@@ -196,39 +355,355 @@ class JianYingASR(BaseASR):
         self.store_uri = store_infos['Result']['UploadAddress']['StoreInfos'][0]['StoreUri']
         return store_infos
 
+    def _upload_parts(self) -> List[Tuple[int, memoryview]]:
+        """按 UPLOAD_PART_SIZE 切分数据，返回 [(partNumber, 分片)]，不复制数据"""
+        payload = memoryview(self.file_binary)
+        if len(payload) <= UPLOAD_PART_SIZE:
+            return [(1, payload)]
+        return [(i // UPLOAD_PART_SIZE + 1, payload[i:i + UPLOAD_PART_SIZE])
+                for i in range(0, len(payload), UPLOAD_PART_SIZE)]
+
+    def _part_crc32(self, part: memoryview) -> str:
+        if len(part) == len(self.file_binary):
+            return self.crc32_hex
+        return format(zlib.crc32(part) & 0xFFFFFFFF, '08x')
+
     def _upload_file(self):
-        """Upload the file"""
-        url = f"https://{self.upload_hosts}/{self.store_uri}?partNumber=1&uploadID={self.upload_id}"
-        headers = self._uplosd_headers()
-        response = requests.put(url, data=self.file_binary, headers=headers)
-        resp_data = response.json()
-        assert resp_data['success'] == 0, f"File upload failed: {response.text}"
-        return resp_data
+        """Upload the file parts that have not been uploaded yet"""
+        for part_number, part in self._upload_parts():
+            if part_number in self.uploaded_parts:
+                continue
+            crc32_hex = self._part_crc32(part)
+            url = f"https://{self.upload_hosts}/{self.store_uri}?partNumber={part_number}&uploadID={self.upload_id}"
+            for attempt in range(UPLOAD_PART_RETRIES):
+                try:
+                    response = self.session.put(url, data=part, headers=self._uplosd_headers(crc32_hex))
+                    self.bytes_sent += len(part)
+                    resp_data = response.json()
+                    assert resp_data['success'] == 0, f"File upload failed: {response.text}"
+                    break
+                except (requests.exceptions.RequestException, ValueError, AssertionError):
+                    if attempt == UPLOAD_PART_RETRIES - 1:
+                        raise
+            self.uploaded_parts[part_number] = crc32_hex
+        logging.info(f"上传完成, 发送{self.bytes_sent}字节, 文件大小{len(self.file_binary)}字节")
+
+    async def _aupload_file(self):
+        """Upload the file parts that have not been uploaded yet (async)"""
+        session = await get_async_session()
+        for part_number, part in self._upload_parts():
+            if part_number in self.uploaded_parts:
+                continue
+            crc32_hex = self._part_crc32(part)
+            url = f"https://{self.upload_hosts}/{self.store_uri}?partNumber={part_number}&uploadID={self.upload_id}"
+            for attempt in range(UPLOAD_PART_RETRIES):
+                try:
+                    async with session.put(url, data=part, headers=self._uplosd_headers(crc32_hex)) as response:
+                        self.bytes_sent += len(part)
+                        resp_data = await response.json(content_type=None)
+                        assert resp_data['success'] == 0, f"File upload failed: {await response.text()}"
+                    break
+                except Exception:
+                    if attempt == UPLOAD_PART_RETRIES - 1:
+                        raise
+            self.uploaded_parts[part_number] = crc32_hex
+        logging.info(f"上传完成, 发送{self.bytes_sent}字节, 文件大小{len(self.file_binary)}字节")
+
+    def _check_payload(self) -> str:
+        return ",".join(f"{n}:{crc}" for n, crc in sorted(self.uploaded_parts.items()))
 
     def _upload_check(self):
-        """Check upload result"""
+        """Check upload result, completing the multipart upload"""
         url = f"https://{self.upload_hosts}/{self.store_uri}?uploadID={self.upload_id}"
-        payload = f"1:{self.crc32_hex}"
         headers = self._uplosd_headers()
-        response = requests.post(url, data=payload, headers=headers)
+        response = self.session.post(url, data=self._check_payload(), headers=headers)
         resp_data = response.json()
+        self._raise_for_check(resp_data, response.text)
         return resp_data
 
+    async def _aupload_check(self):
+        """Check upload result (async)"""
+        url = f"https://{self.upload_hosts}/{self.store_uri}?uploadID={self.upload_id}"
+        session = await get_async_session()
+        async with session.post(url, data=self._check_payload(), headers=self._uplosd_headers()) as response:
+            resp_data = await response.json(content_type=None)
+            self._raise_for_check(resp_data, await response.text())
+        return resp_data
+
+    @staticmethod
+    def _raise_for_check(resp_data: dict, text: str) -> None:
+        """合并分片是上传的最后一步，失败时 store_uri 不可用，不能继续提交任务"""
+        if not isinstance(resp_data, dict) or resp_data.get('success') != 0:
+            raise RuntimeError(f"Upload check failed: {text}")
+
     def _upload_commit(self):
-        """Commit the uploaded file"""
-        url = f"https://{self.upload_hosts}/{self.store_uri}?uploadID={self.upload_id}&partNumber=1&x-amz-security-token={self.session_token}"
-        headers = self._uplosd_headers()
-        response = requests.put(url, data=self.file_binary, headers=headers)
+        """Commit the uploaded file
+
+        分片在 _upload_check 中已合并完成，这里不再重复发送文件内容。
+        """
         return self.store_uri
 
+    async def _aupload_commit(self):
+        """Commit the uploaded file (async)"""
+        return self._upload_commit()
+
+class JianYingJob:
+    """剪映识别任务句柄，按指数退避轮询 query 直到结果就绪"""
+
+    def __init__(self, asr: JianYingASR, query_id: str):
+        self.asr = asr
+        self.query_id = query_id
+
+    @staticmethod
+    def is_ready(resp_data: dict) -> bool:
+        data = resp_data.get('data') or {}
+        return 'utterances' in data
+
+    def check(self, resp_data: dict) -> None:
+        """服务端返回错误（ret 非 0）时任务不会再完成，抛出 RuntimeError 而不是继续轮询"""
+        ret = resp_data.get('ret')
+        if ret is not None and str(ret) != '0':
+            raise RuntimeError(f"任务{self.query_id}查询失败: ret={ret} {resp_data.get('errmsg', '')}")
+
+    def _intervals(self, timeout: float):
+        deadline = time.monotonic() + timeout
+        interval = QUERY_MIN_INTERVAL
+        while time.monotonic() < deadline:
+            yield interval
+            interval = min(interval * 1.5, QUERY_MAX_INTERVAL)
+
+    def poll(self) -> Optional[dict]:
+        """查询一次，结果未就绪时返回 None，服务端返回错误时抛出 RuntimeError"""
+        resp_data = self.asr.query(self.query_id)
+        self.check(resp_data)
+        return resp_data if self.is_ready(resp_data) else None
+
+    async def apoll(self) -> Optional[dict]:
+        resp_data = await self.asr.aquery(self.query_id)
+        self.check(resp_data)
+        return resp_data if self.is_ready(resp_data) else None
+
+    def wait(self, timeout: float = QUERY_TIMEOUT) -> dict:
+        """轮询直到结果就绪，超时抛出 TimeoutError（query_id 仍保留，可稍后继续）"""
+        for interval in self._intervals(timeout):
+            resp_data = self.poll()
+            if resp_data is not None:
+                return resp_data
+            time.sleep(interval)
+        raise TimeoutError(f"任务{self.query_id}超时未完成")
+
+    async def await_result(self, timeout: float = QUERY_TIMEOUT) -> dict:
+        """轮询直到结果就绪（异步）"""
+        for interval in self._intervals(timeout):
+            resp_data = await self.apoll()
+            if resp_data is not None:
+                return resp_data
+            await asyncio.sleep(interval)
+        raise TimeoutError(f"任务{self.query_id}超时未完成")
+
+
+class SignClient:
+    """签名服务客户端
+
+    签名按 (url, 时间窗口, tdid, pf, appvr) 缓存，同一窗口内的任务共用签名；
+    并发请求同一签名时只发起一次网络请求。签名在用到时才请求，
+    上传凭证已缓存或上传耗时较长时，不会预先取到用不上或已过期的签名。
+    请求失败时抛出 RuntimeError，只影响当前任务。
+    """
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, sign_url: str = SIGN_URL, window: int = SIGN_WINDOW):
+        self.sign_url = sign_url
+        self.window = window
+        self.requests_sent = 0
+        self._cache: Dict[tuple, Tuple[str, str]] = {}
+        self._pending: Dict[tuple, Future] = {}
+        self._apending: Dict[tuple, asyncio.Future] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def get_instance(cls, sign_url: str = SIGN_URL) -> 'SignClient':
+        with cls._instances_lock:
+            if sign_url not in cls._instances:
+                cls._instances[sign_url] = cls(sign_url)
+            return cls._instances[sign_url]
+
+    def _key(self, url: str, tdid: str, pf: str, appvr: str) -> tuple:
+        window_start = int(time.time()) // self.window * self.window
+        return url, str(window_start), tdid, pf, appvr
+
+    def _lookup(self, key: tuple) -> Optional[Tuple[str, str]]:
+        with self._lock:
+            # 丢弃过期窗口的签名
+            if self._cache and next(iter(self._cache))[1] != key[1]:
+                self._cache = {k: v for k, v in self._cache.items() if k[1] == key[1]}
+            return self._cache.get(key)
+
+    def sign(self, url: str, tdid: str, pf: str = '4', appvr: str = '4.0.0') -> Tuple[str, str]:
+        """返回 (sign, device_time)"""
+        key = self._key(url, tdid, pf, appvr)
+        cached = self._lookup(key)
+        if cached:
+            return cached
+        with self._lock:
+            future = self._pending.get(key)
+            owner = future is None
+            if owner:
+                future = self._pending[key] = Future()
+        if not owner:
+            return future.result()
+        try:
+            result = self._fetch(key)
+            with self._lock:
+                self._cache[key] = result
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+
+    async def asign(self, url: str, tdid: str, pf: str = '4', appvr: str = '4.0.0') -> Tuple[str, str]:
+        """返回 (sign, device_time)（异步）"""
+        key = self._key(url, tdid, pf, appvr)
+        cached = self._lookup(key)
+        if cached:
+            return cached
+        loop = asyncio.get_running_loop()
+        pending_key = (id(loop),) + key
+        future = self._apending.get(pending_key)
+        if future is not None:
+            return await future
+        future = self._apending[pending_key] = loop.create_future()
+        try:
+            result = await self._afetch(key)
+            with self._lock:
+                self._cache[key] = result
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            self._apending.pop(pending_key, None)
+
+    @staticmethod
+    def _request_data(key: tuple) -> Dict[str, str]:
+        url, current_time, tdid, pf, appvr = key
+        return {
+            'url': url,
+            'current_time': current_time,
+            'pf': pf,
+            'appvr': appvr,
+            'tdid': tdid
+        }
+
+    def _fetch(self, key: tuple) -> Tuple[str, str]:
+        self.requests_sent += 1
+        try:
+            response = get_session().post(self.sign_url, json=self._request_data(key))
+            response.raise_for_status()
+            response_data = response.json()
+            sign_value = response_data.get('sign')
+            if not sign_value:
+                raise ValueError("No 'sign' in response")
+        except requests.exceptions.RequestException as e:
+            raise RuntimeError(f"HTTP Request failed: {e}") from e
+        except ValueError as ve:
+            raise RuntimeError(f"Invalid response: {ve}") from ve
+        return sign_value.lower(), key[1]
+
+    async def _afetch(self, key: tuple) -> Tuple[str, str]:
+        self.requests_sent += 1
+        session = await get_async_session()
+        try:
+            async with session.post(self.sign_url, json=self._request_data(key)) as response:
+                response.raise_for_status()
+                response_data = await response.json(content_type=None)
+            sign_value = response_data.get('sign')
+            if not sign_value:
+                raise ValueError("No 'sign' in response")
+        except ValueError as ve:
+            raise RuntimeError(f"Invalid response: {ve}") from ve
+        except Exception as e:
+            raise RuntimeError(f"HTTP Request failed: {e}") from e
+        return sign_value.lower(), key[1]
+
+
+class UploadCredentials:
+    """上传 STS 凭证缓存
+
+    凭证按 tdid 缓存到过期前 CREDENTIALS_REFRESH_MARGIN 秒，
+    响应中带有过期时间（expired_time）时以其为准，否则按 CREDENTIALS_TTL 计算。
+    """
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, ttl: int = CREDENTIALS_TTL, refresh_margin: int = CREDENTIALS_REFRESH_MARGIN):
+        self.ttl = ttl
+        self.refresh_margin = refresh_margin
+        self.fetch_count = 0
+        self._cache: Dict[str, Tuple[dict, float]] = {}
+        self._lock = threading.Lock()
+        self._alocks: Dict[int, asyncio.Lock] = {}
+
+    @classmethod
+    def get_instance(cls) -> 'UploadCredentials':
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    def _lookup(self, tdid: str) -> Optional[dict]:
+        item = self._cache.get(tdid)
+        if item and time.time() < item[1] - self.refresh_margin:
+            return item[0]
+        return None
+
+    def _store(self, tdid: str, credentials: dict) -> dict:
+        self.fetch_count += 1
+        expires_at = credentials.get('expired_time')
+        if not isinstance(expires_at, (int, float)):
+            expires_at = time.time() + self.ttl
+        self._cache[tdid] = (credentials, expires_at)
+        return credentials
+
+    def get(self, tdid: str, fetch) -> dict:
+        """返回缓存的凭证，失效时调用 fetch() 重新获取"""
+        with self._lock:
+            credentials = self._lookup(tdid)
+            if credentials is None:
+                credentials = self._store(tdid, fetch())
+            return credentials
+
+    async def aget(self, tdid: str, afetch) -> dict:
+        """返回缓存的凭证（异步），同一事件循环内的并发请求只获取一次"""
+        credentials = self._lookup(tdid)
+        if credentials is not None:
+            return credentials
+        loop_id = id(asyncio.get_running_loop())
+        lock = self._alocks.setdefault(loop_id, asyncio.Lock())
+        async with lock:
+            credentials = self._lookup(tdid)
+            if credentials is None:
+                credentials = self._store(tdid, await afetch())
+            return credentials
+
+    def invalidate(self, tdid: str) -> None:
+        self._cache.pop(tdid, None)
+
 
 def sign(key: bytes, msg: str) -> bytes:
     """使用HMAC-SHA256生成签名"""
     return hmac.new(key, msg.encode('utf-8'), hashlib.sha256).digest()
 
 
+@functools.lru_cache(maxsize=64)
 def get_signature_key(secret_key: str, date_stamp: str, region_name: str, service_name: str) -> bytes:
-    """生成用于AWS签名的密钥"""
+    """生成用于AWS签名的密钥，同一凭证在同一天内复用计算结果"""
     k_date = sign(('AWS4' + secret_key).encode('utf-8'), date_stamp)
     k_region = sign(k_date, region_name)
     k_service = sign(k_region, service_name)
@@ -1,23 +1,39 @@
-import requests
-
 from .ASRData import ASRDataSeg
 from .BaseASR import BaseASR
+from .HttpClient import MultipartStream, get_async_session, get_session
+
+
+API_SUBMIT = "https://ai.kuaishou.com/api/effects/subtitle_generate"
 
 
 class KuaiShouASR(BaseASR):
     def __init__(self, audio_path: [str, bytes], use_cache: bool = False):
         super().__init__(audio_path, use_cache)
+        self.session = get_session()
 
     def _run(self) -> dict:
         return self._submit()
 
+    async def _arun(self) -> dict:
+        return await self._asubmit()
+
     def _make_segments(self, resp_data: dict) -> list[ASRDataSeg]:
         return [ASRDataSeg(u['text'], u['start_time'], u['end_time']) for u in resp_data['data']['text']]
 
     def _submit(self) -> dict:
+        body = self._build_body()
+        result = self.session.post(API_SUBMIT, data=body, headers={'Content-Type': body.content_type})
+        return result.json()
+
+    async def _asubmit(self) -> dict:
+        body = self._build_body()
+        session = await get_async_session()
+        headers = {'Content-Type': body.content_type, 'Content-Length': str(len(body))}
+        async with session.post(API_SUBMIT, data=body, headers=headers) as result:
+            return await result.json(content_type=None)
+
+    def _build_body(self) -> MultipartStream:
         payload = {
             "typeId": "1"
         }
-        files = [('file', ('test.mp3', self.file_binary, 'audio/mpeg'))]
-        result = requests.post("https://ai.kuaishou.com/api/effects/subtitle_generate", data=payload, files=files)
-        return result.json()
+        return MultipartStream(payload, [('file', 'test.mp3', self.file_binary, 'audio/mpeg')])
@@ -0,0 +1,137 @@
+import logging
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, List, Optional, Tuple
+
+# 工作线程退出标记
+_STOP = object()
+
+
+class Stage:
+    """流水线中的一级：固定数量的工作线程从输入队列取任务，处理后交给下一级"""
+
+    def __init__(self, name: str, func: Callable[[Any], Any], workers: int, inbox: queue.Queue):
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+        self.inbox = inbox
+        self.next: Optional['Stage'] = None
+        self.threads: List[threading.Thread] = []
+
+
+class Pipeline:
+    """分级流水线
+
+    每一级有独立的线程数，级与级之间以有界队列相连：下游处理不过来时上游阻塞，
+    已解码但未上传的音频不会无限堆积。CPU 密集的级（ffmpeg 转码、视频合成）按核数配置，
+    网络等待为主的级（上传、轮询）可以配置更多线程，让更多请求同时在途。
+
+    stages 为 [(名称, 处理函数, 线程数)]，处理函数接收并返回任务对象；
+    任务完成所有级后调用 on_done，任一级抛出异常时调用 on_error 并丢弃该任务。
+    处理函数也可以返回 Future（如等待远端识别结果）：工作线程不等待，立即处理下一个任务，
+    Future 完成后由转发线程把其结果作为任务对象交给下一级。
+    """
+
+    def __init__(self, stages: List[Tuple[str, Callable[[Any], Any], int]], queue_size: int = 4,
+                 on_done: Callable[[Any], None] = None, on_error: Callable[[Any, Exception], None] = None):
+        self.on_done = on_done
+        self.on_error = on_error
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self.stages: List[Stage] = []
+        for i, (name, func, workers) in enumerate(stages):
+            # 第一级的输入是待处理文件，不限长度，提交时不会阻塞界面线程
+            inbox = queue.Queue() if i == 0 else queue.Queue(maxsize=queue_size)
+            stage = Stage(name, func, workers, inbox)
+            if self.stages:
+                self.stages[-1].next = stage
+            self.stages.append(stage)
+        # 已完成的 Future：(所在级, 原任务, Future)
+        self._completed = queue.Queue()
+        self._forwarder = threading.Thread(target=self._forward, name="pipeline-forward", daemon=True)
+        self._forwarder.start()
+        for stage in self.stages:
+            for n in range(stage.workers):
+                thread = threading.Thread(target=self._work, args=(stage,), name=f"{stage.name}-{n}", daemon=True)
+                thread.start()
+                stage.threads.append(thread)
+
+    def submit(self, job: Any) -> None:
+        """提交任务，立即返回"""
+        with self._lock:
+            self._pending += 1
+        self.stages[0].inbox.put(job)
+
+    def pending(self) -> int:
+        """尚未完成的任务数"""
+        with self._lock:
+            return self._pending
+
+    def join(self, timeout: float = None) -> bool:
+        """等待所有已提交的任务完成"""
+        with self._idle:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """停止所有工作线程；wait 为 True 时先等待已提交的任务处理完，否则只应在空闲时调用"""
+        if wait:
+            self.join()
+        self._completed.put(_STOP)
+        for stage in self.stages:
+            for _ in stage.threads:
+                stage.inbox.put(_STOP)
+            if wait:
+                for thread in stage.threads:
+                    thread.join()
+
+    def _finish(self, job: Any, error: Optional[Exception]) -> None:
+        try:
+            if error is None:
+                if self.on_done:
+                    self.on_done(job)
+            elif self.on_error:
+                self.on_error(job, error)
+            else:
+                logging.error(f"流水线任务出错: {error}")
+        except Exception as e:
+            logging.error(f"流水线回调出错: {e}")
+        with self._idle:
+            self._pending -= 1
+            self._idle.notify_all()
+
+    def _work(self, stage: Stage) -> None:
+        while True:
+            job = stage.inbox.get()
+            if job is _STOP:
+                return
+            try:
+                result = stage.func(job)
+            except Exception as e:
+                self._finish(job, e)
+                continue
+            if isinstance(result, Future):
+                # 完成回调运行在其他组件的线程中，下一级队列已满时不能阻塞它，交给转发线程投递
+                result.add_done_callback(lambda future, stage=stage, job=job: self._completed.put((stage, job, future)))
+            else:
+                self._advance(stage, result)
+
+    def _forward(self) -> None:
+        while True:
+            item = self._completed.get()
+            if item is _STOP:
+                return
+            stage, job, future = item
+            try:
+                job = future.result()
+            except Exception as e:
+                self._finish(job, e)
+                continue
+            self._advance(stage, job)
+
+    def _advance(self, stage: Stage, job: Any) -> None:
+        if stage.next is None:
+            self._finish(job, None)
+        else:
+            stage.next.inbox.put(job)
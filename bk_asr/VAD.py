@@ -0,0 +1,201 @@
+import asyncio
+import bisect
+import logging
+import math
+import warnings
+from array import array
+from typing import Iterable, Iterator, List, Optional, Tuple, Type
+
+from .ASRData import ASRData, ASRDataSeg
+from .AudioUtils import encode_pcm_stream, iter_pcm
+from .BaseASR import BaseASR
+
+try:
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", DeprecationWarning)
+        import audioop
+except ImportError:
+    audioop = None
+
+
+def _frame_rms(frame: bytes) -> float:
+    if audioop is not None:
+        return audioop.rms(frame, 2)
+    samples = array('h')
+    samples.frombytes(frame)
+    return math.sqrt(sum(x * x for x in samples) / len(samples)) if samples else 0.0
+
+
+class EnergyVAD:
+    """基于短时能量的语音活动检测
+
+    按帧计算 RMS 能量（dBFS），阈值默认取噪声底（能量的 10% 分位数）之上 margin_db。
+    短于 min_silence 的静音并入前后语音，短于 min_speech 的语音丢弃，
+    每段语音前后各保留 padding 毫秒。
+    """
+
+    def __init__(self, frame_ms: int = 30, threshold_db: float = None, margin_db: float = 10.0,
+                 min_speech: int = 200, min_silence: int = 800, padding: int = 200):
+        self.frame_ms = frame_ms
+        self.threshold_db = threshold_db
+        self.margin_db = margin_db
+        self.min_speech = min_speech
+        self.min_silence = min_silence
+        self.padding = padding
+
+    def detect(self, pcm: bytes, sample_rate: int = 16000) -> List[Tuple[int, int]]:
+        """返回语音区间 [(开始毫秒, 结束毫秒)]"""
+        return self.spans(*self.levels([pcm], sample_rate))
+
+    def levels(self, chunks: Iterable[bytes], sample_rate: int = 16000) -> Tuple[array, int]:
+        """逐块计算每帧能量（dBFS），返回 (各帧能量, 总时长毫秒)；每帧只保留一个数值，不保留 PCM"""
+        frame_bytes = sample_rate * self.frame_ms // 1000 * 2
+        levels = array('f')
+        total_bytes = 0
+        rest = b''
+        for chunk in chunks:
+            total_bytes += len(chunk)
+            buffer = rest + chunk if rest else chunk
+            end = len(buffer) - len(buffer) % frame_bytes
+            for i in range(0, end, frame_bytes):
+                rms = _frame_rms(buffer[i:i + frame_bytes])
+                levels.append(20 * math.log10(rms / 32768) if rms > 0 else -100.0)
+            rest = buffer[end:]
+        return levels, total_bytes // 2 * 1000 // sample_rate
+
+    def spans(self, levels: array, total: int) -> List[Tuple[int, int]]:
+        """由各帧能量得到语音区间，加上 padding 后重叠的区间合并为一段"""
+        if not levels:
+            return []
+        threshold = self.threshold_db
+        if threshold is None:
+            threshold = sorted(levels)[len(levels) // 10] + self.margin_db
+
+        spans = []
+        start = None
+        for n, level in enumerate(levels):
+            if level >= threshold and start is None:
+                start = n * self.frame_ms
+            elif level < threshold and start is not None:
+                spans.append([start, n * self.frame_ms])
+                start = None
+        if start is not None:
+            spans.append([start, len(levels) * self.frame_ms])
+
+        merged = []
+        for span in spans:
+            if merged and span[0] - merged[-1][1] < self.min_silence:
+                merged[-1][1] = span[1]
+            else:
+                merged.append(span)
+        padded = []
+        for s, e in merged:
+            if e - s < self.min_speech:
+                continue
+            s, e = max(0, s - self.padding), min(total, e + self.padding)
+            if padded and s <= padded[-1][1]:
+                padded[-1] = (padded[-1][0], e)
+            else:
+                padded.append((s, e))
+        return padded
+
+
+class OffsetMap:
+    """裁剪后时间轴到原始时间轴的映射"""
+
+    def __init__(self, spans: List[Tuple[int, int]]):
+        # 每段语音在裁剪后音频中的起点，以及对应的原始起点
+        self.trimmed_starts = []
+        self.original_starts = []
+        self.lengths = []
+        position = 0
+        for start, end in spans:
+            self.trimmed_starts.append(position)
+            self.original_starts.append(start)
+            self.lengths.append(end - start)
+            position += end - start
+
+    def to_original(self, ms: float, is_end: bool = False) -> float:
+        """裁剪后的时间点映射回原始时间；正好落在两段交界处时，结束时间归前一段"""
+        if not self.trimmed_starts:
+            return ms
+        if is_end:
+            i = max(0, bisect.bisect_left(self.trimmed_starts, ms) - 1)
+        else:
+            i = max(0, bisect.bisect_right(self.trimmed_starts, ms) - 1)
+        offset = min(ms - self.trimmed_starts[i], self.lengths[i])
+        return self.original_starts[i] + offset
+
+    def remap(self, asr_data: ASRData) -> ASRData:
+        return ASRData([ASRDataSeg(seg.text, self.to_original(seg.start_time), self.to_original(seg.end_time, True))
+                        for seg in asr_data])
+
+
+def _speech_chunks(audio_path: str, spans: List[Tuple[int, int]], sample_rate: int) -> Iterator[bytes]:
+    """再次流式解码，只产出语音区间内的 PCM（spans 须按时间排序且互不重叠）"""
+    bytes_per_ms = sample_rate * 2 / 1000
+    ranges = [(int(s * bytes_per_ms) // 2 * 2, int(e * bytes_per_ms) // 2 * 2) for s, e in spans]
+    i = 0
+    position = 0
+    pcm = iter_pcm(audio_path, sample_rate)
+    try:
+        for chunk in pcm:
+            chunk_end = position + len(chunk)
+            while i < len(ranges) and ranges[i][0] < chunk_end:
+                start, end = ranges[i]
+                yield chunk[max(start, position) - position:min(end, chunk_end) - position]
+                if end > chunk_end:
+                    break
+                i += 1
+            position = chunk_end
+            if i == len(ranges):
+                # 后面都是静音，不必继续解码
+                break
+    finally:
+        pcm.close()
+
+
+def trim_silence(audio_path: str, vad: EnergyVAD = None, sample_rate: int = 16000,
+                 output_args: Optional[List[str]] = None) -> Tuple[bytes, OffsetMap]:
+    """裁掉非语音部分，返回 mp3 数据及时间映射；output_args 为编码参数，见 encode_pcm_stream
+
+    解码两遍：第一遍逐帧计算能量，第二遍只把语音区间送入编码器，
+    内存中只保留每帧一个能量值和编码后的 mp3，不保留整段 PCM。
+    """
+    vad = vad or EnergyVAD()
+    levels, total = vad.levels(iter_pcm(audio_path, sample_rate), sample_rate)
+    spans = vad.spans(levels, total)
+    kept = sum(e - s for s, e in spans)
+    logging.info(f"VAD 保留语音 {kept / 1000:.1f}s / {total / 1000:.1f}s: {audio_path}")
+    if not spans:
+        return b'', OffsetMap([])
+    data = encode_pcm_stream(_speech_chunks(audio_path, spans, sample_rate), sample_rate, output_args)
+    return data, OffsetMap(spans)
+
+
+class VADASR:
+    """识别前裁掉非语音部分，识别后把时间戳映射回原始时间轴"""
+
+    def __init__(self, audio_path: str, engine: Type[BaseASR], vad: EnergyVAD = None, sample_rate: int = 16000,
+                 **engine_kwargs):
+        self.audio_path = audio_path
+        self.engine = engine
+        self.vad = vad or EnergyVAD()
+        self.sample_rate = sample_rate
+        self.engine_kwargs = engine_kwargs
+
+    def trim(self) -> Tuple[bytes, OffsetMap]:
+        """返回裁剪后的 mp3 数据及时间映射"""
+        return trim_silence(self.audio_path, self.vad, self.sample_rate)
+
+    def run(self) -> ASRData:
+        data, offset_map = self.trim()
+        if not data:
+            return ASRData([])
+        return offset_map.remap(self.engine(data, **self.engine_kwargs).run())
+
+    async def arun(self) -> ASRData:
+        data, offset_map = await asyncio.to_thread(self.trim)
+        if not data:
+            return ASRData([])
+        return offset_map.remap(await self.engine(data, **self.engine_kwargs).arun())
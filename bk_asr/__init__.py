@@ -1,12 +1,19 @@
 from .BcutASR import BcutASR
 from .JianYingASR import JianYingASR
 from .KuaiShouASR import KuaiShouASR
+from .VAD import VADASR
 # from .WhisperASR import WhisperASR
 
-__all__ = ["BcutASR", "JianYingASR", "KuaiShouASR"]
+__all__ = ["BcutASR", "JianYingASR", "KuaiShouASR", "VADASR"]
 
+# transcribe 可选的识别引擎
+PLATFORMS = ["BcutASR", "JianYingASR", "KuaiShouASR"]
 
-def transcribe(audio_file, platform):
-    assert platform in __all__
+
+def transcribe(audio_file, platform, vad: bool = False):
+    """vad 为 True 时先裁掉静音再识别（audio_file 需为文件路径），时间戳仍对应原始音频"""
+    assert platform in PLATFORMS
+    if vad:
+        return VADASR(audio_file, globals()[platform]).run()
     asr = globals()[platform](audio_file)
     return asr.run()